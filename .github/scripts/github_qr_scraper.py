@@ -18,6 +18,9 @@ except ImportError:
     print("❌ Playwright not installed")
     sys.exit(1)
 
+from src.utils.metrics_registry import export_from_env
+from src.utils.scrape_metrics import ScrapeMetrics, TRANSFER_SIZE_JS
+
 class GitHubQRScraper:
     def __init__(self):
         self.username = os.environ.get('RISE_USERNAME')
@@ -40,6 +43,19 @@ class GitHubQRScraper:
         """Scrape QR code using Playwright"""
         print(f"🚀 Starting QR scrape at {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}")
         
+        metrics = ScrapeMetrics('github_scraper')
+        success = False
+        try:
+            success = self._browser_scrape(metrics)
+            return success
+        finally:
+            # Recorded only once sync_playwright() has exited and the driver
+            # and browser have been reaped, so their peak RSS is counted
+            metrics.finish(success)
+    
+    def _browser_scrape(self, metrics):
+        """Drive the browser through one scrape, timing phases into metrics"""
+        metrics.begin('browser_launch')
         with sync_playwright() as p:
             try:
                 # Launch browser in headless mode
@@ -56,17 +72,21 @@ class GitHubQRScraper:
                 page = context.new_page()
                 
                 # Navigate and login
+                metrics.begin('navigation')
                 print("📱 Navigating to Rise Gym...")
                 page.goto(self.login_url, wait_until='networkidle')
                 page.wait_for_timeout(2000)
                 
                 # Fill login form
+                metrics.begin('login')
+                metrics.add_bytes(page.evaluate(TRANSFER_SIZE_JS))
                 print("🔐 Logging in...")
                 page.fill('input[placeholder*="Email" i]', self.username)
                 page.fill('input[type="password"]', self.password)
                 page.keyboard.press('Enter')
                 
                 # Wait for dashboard
+                metrics.begin('dashboard_wait')
                 print("⏳ Waiting for dashboard...")
                 page.wait_for_function(
                     '''() => {
@@ -77,6 +97,7 @@ class GitHubQRScraper:
                 )
                 
                 # Find and save QR code
+                metrics.begin('extraction')
                 print("🔍 Looking for QR code...")
                 svg_elements = page.query_selector_all('svg')
                 
@@ -92,7 +113,10 @@ class GitHubQRScraper:
                             largest_svg = html
                     
                     if largest_svg and largest_size > 1000:
+                        metrics.add_bytes(page.evaluate(TRANSFER_SIZE_JS))
+                        
                         # Save QR code with timestamp
+                        metrics.begin('save')
                         timestamp = datetime.now().strftime("%H%M%S")
                         filename = self.date_dir / f"qr_{timestamp}.svg"
                         
@@ -130,6 +154,7 @@ def main():
     print("=" * 60)
     print("GitHub Actions QR Scraper")
     print("=" * 60)
+    export_from_env()
     
     try:
         scraper = GitHubQRScraper()
@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
 """Push a new test to trigger real-time update"""
 
+import os
 import requests
 import json
 from datetime import datetime
 import time
 
-DATABASE_URL = "https://rise-gym-qr-default-rtdb.europe-west1.firebasedatabase.app"
+# Set FIREBASE_DATABASE_URL to test against another database (e.g. src/utils/local_rtdb.py)
+DATABASE_URL = os.environ.get(
+    "FIREBASE_DATABASE_URL",
+    "https://rise-gym-qr-default-rtdb.europe-west1.firebasedatabase.app"
+).rstrip("/")
 
 # Wait a moment
 time.sleep(2)
@@ -26,7 +26,7 @@ import json
 class RiseGymQRGenerator:
     """Generate QR codes matching Rise Gym's exact format"""
     
-    def __init__(self):
+    def __init__(self, timezone='America/New_York'):
         # QR parameters determined from reverse engineering
         self.qr_params = {
             'version': 1,  # 21x21 modules
@@ -36,8 +36,8 @@ class RiseGymQRGenerator:
             'border': 4,    # 4 module quiet zone
         }
         
-        # Time zone for Rise Gym (Eastern Time)
-        self.timezone = pytz.timezone('America/New_York')
+        # Time zone for Rise Gym (Eastern Time unless overridden)
+        self.timezone = pytz.timezone(timezone)
         
     def generate_qr_data(self, dt):
         """Generate QR data string for given datetime"""
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Rise Gym QR Module Matrix
+Parses rect-based QR SVGs into module matrices and decodes their payload
+
+Rise Gym serves version 1 (21x21) codes drawn as one <rect> per dark
+module, so the matrix can be read straight from the markup without
+rasterizing, and the payload can be decoded without an image library.
+"""
+
+import re
+import zlib
+import struct
+
+RECT_PATTERN = re.compile(r'<rect\b([^>]*)>')
+ATTR_PATTERN = re.compile(r'([\w-]+)="([^"]*)"')
+
+# Format info BCH code (ISO 18004 annex C)
+FORMAT_GENERATOR = 0b10100110111
+FORMAT_MASK = 0b101010000010010
+
+# Error correction bits in format info -> level name
+EC_LEVELS = {1: 'L', 0: 'M', 3: 'Q', 2: 'H'}
+
+# Data codewords per error correction level for version 1
+VERSION1_DATA_CODEWORDS = {'L': 19, 'M': 16, 'Q': 13, 'H': 9}
+
+ALPHANUMERIC_CHARS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:'
+
+MASK_FUNCTIONS = [
+    lambda i, j: (i + j) % 2 == 0,
+    lambda i, j: i % 2 == 0,
+    lambda i, j: j % 3 == 0,
+    lambda i, j: (i + j) % 3 == 0,
+    lambda i, j: (i // 2 + j // 3) % 2 == 0,
+    lambda i, j: (i * j) % 2 + (i * j) % 3 == 0,
+    lambda i, j: ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+    lambda i, j: ((i * j) % 3 + (i + j) % 2) % 2 == 0,
+]
+
+
+def _bch_format_bits(data):
+    """Encode 5 format data bits into the masked 15-bit format word"""
+    value = data << 10
+    while value.bit_length() >= 11:
+        value ^= FORMAT_GENERATOR << (value.bit_length() - 11)
+    return ((data << 10) | value) ^ FORMAT_MASK
+
+
+FORMAT_WORDS = {_bch_format_bits(data): data for data in range(32)}
+
+
+def _is_dark(attrs):
+    """Check whether a rect's fill paints a dark module"""
+    fill = attrs.get('fill', '#000000').lower()
+    return fill not in ('#ffffff', '#fff', 'white', 'none')
+
+
+def parse_svg_matrix(svg_content):
+    """Parse a rect-based QR SVG into a module matrix
+
+    Args:
+        svg_content: SVG markup with one <rect> per dark module
+
+    Returns:
+        Square list of lists of bools (True = dark), or None if the SVG
+        does not look like a module grid
+    """
+    rects = []
+    for match in RECT_PATTERN.finditer(svg_content):
+        attrs = dict(ATTR_PATTERN.findall(match.group(1)))
+        if not _is_dark(attrs):
+            continue
+        try:
+            rects.append((
+                float(attrs.get('x', 0)),
+                float(attrs.get('y', 0)),
+                float(attrs['width']),
+                float(attrs['height'])
+            ))
+        except (KeyError, ValueError):
+            continue
+
+    if not rects:
+        return None
+
+    module = min(min(w, h) for _, _, w, h in rects)
+    if module <= 0:
+        return None
+
+    # The top-left finder pattern puts a dark module at the grid origin
+    origin_x = min(x for x, _, _, _ in rects)
+    origin_y = min(y for _, y, _, _ in rects)
+    size = int(round((max(x + w for x, _, w, _ in rects) - origin_x) / module))
+    if size < 21 or (size - 17) % 4 != 0:
+        return None
+
+    matrix = [[False] * size for _ in range(size)]
+    for x, y, w, h in rects:
+        col = int(round((x - origin_x) / module))
+        row = int(round((y - origin_y) / module))
+        for r in range(row, min(size, row + int(round(h / module)))):
+            for c in range(col, min(size, col + int(round(w / module)))):
+                matrix[r][c] = True
+
+    return matrix
+
+
+def read_format_info(matrix):
+    """Read error correction level and mask pattern from format info
+
+    Returns:
+        (ec_level, mask_pattern) or None if the format bits are unreadable
+    """
+    size = len(matrix)
+    bits = 0
+    for i in range(15):
+        if i < 6:
+            dark = matrix[i][8]
+        elif i < 8:
+            dark = matrix[i + 1][8]
+        else:
+            dark = matrix[size - 15 + i][8]
+        if dark:
+            bits |= 1 << i
+
+    # Pick the closest valid format word (tolerates a few flipped bits)
+    word, data = min(FORMAT_WORDS.items(), key=lambda item: bin(item[0] ^ bits).count('1'))
+    if bin(word ^ bits).count('1') > 3:
+        return None
+
+    return EC_LEVELS[data >> 3], data & 0b111
+
+
+def is_function_module(size, row, col):
+    """Check whether a module belongs to a version 1 function pattern"""
+    if row <= 8 and (col <= 8 or col >= size - 8):
+        return True
+    if row >= size - 8 and col <= 8:
+        return True
+    return row == 6 or col == 6
+
+
+def is_format_module(size, row, col):
+    """Check whether a module carries format information"""
+    if row == 8 and (col <= 8 or col >= size - 8) and col != 6:
+        return True
+    if col == 8 and (row <= 8 or row >= size - 7) and row != 6:
+        return True
+    return False
+
+
+def data_module_positions(size):
+    """List (row, col) of data modules in codeword placement order"""
+    positions = []
+    row = size - 1
+    step = -1
+    col = size - 1
+    while col > 0:
+        if col == 6:
+            col -= 1
+        while 0 <= row < size:
+            for c in (col, col - 1):
+                if not is_function_module(size, row, c):
+                    positions.append((row, c))
+            row += step
+        row -= step
+        step = -step
+        col -= 2
+    return positions
+
+
+def read_codewords(matrix, mask_pattern):
+    """Read and unmask all codewords in placement order"""
+    mask = MASK_FUNCTIONS[mask_pattern]
+    positions = data_module_positions(len(matrix))
+    codewords = []
+    for start in range(0, len(positions) - 7, 8):
+        current = 0
+        for row, col in positions[start:start + 8]:
+            current = (current << 1) | int(matrix[row][col] != mask(row, col))
+        codewords.append(current)
+    return codewords
+
+
+def _decode_segments(data):
+    """Decode numeric, alphanumeric and byte segments from data codewords"""
+    bits = ''.join(f'{byte:08b}' for byte in data)
+    pos = 0
+    result = []
+
+    def take(count):
+        nonlocal pos
+        if pos + count > len(bits):
+            raise ValueError("Bit stream ended early")
+        value = int(bits[pos:pos + count], 2)
+        pos += count
+        return value
+
+    while pos + 4 <= len(bits):
+        mode = take(4)
+        if mode == 0b0000:
+            break
+        if mode == 0b0001:
+            count = take(10)
+            while count >= 3:
+                result.append(f'{take(10):03d}')
+                count -= 3
+            if count == 2:
+                result.append(f'{take(7):02d}')
+            elif count == 1:
+                result.append(str(take(4)))
+        elif mode == 0b0010:
+            count = take(9)
+            while count >= 2:
+                pair = take(11)
+                result.append(ALPHANUMERIC_CHARS[pair // 45] + ALPHANUMERIC_CHARS[pair % 45])
+                count -= 2
+            if count:
+                result.append(ALPHANUMERIC_CHARS[take(6)])
+        elif mode == 0b0100:
+            count = take(8)
+            result.append(bytes(take(8) for _ in range(count)).decode('utf-8', errors='replace'))
+        else:
+            raise ValueError(f"Unsupported segment mode: {mode:04b}")
+
+    return ''.join(result)
+
+
+def decode_matrix(matrix):
+    """Decode the payload of a version 1 module matrix
+
+    Returns:
+        Decoded string, or None if the matrix cannot be decoded
+    """
+    if not matrix or len(matrix) != 21:
+        return None
+
+    format_info = read_format_info(matrix)
+    if not format_info:
+        return None
+
+    ec_level, mask_pattern = format_info
+    codewords = read_codewords(matrix, mask_pattern)
+    try:
+        return _decode_segments(codewords[:VERSION1_DATA_CODEWORDS[ec_level]])
+    except (ValueError, IndexError):
+        return None
+
+
+def diff_matrices(previous, current):
+    """XOR two same-size matrices and group flipped modules by region
+
+    Returns:
+        Dict with the total flip count, counts for 'function', 'format',
+        'data' and 'ec' regions, and the indexes of changed data and error
+        correction codewords. None if the matrices differ in size.
+    """
+    if not previous or not current or len(previous) != len(current):
+        return None
+
+    size = len(current)
+    summary = {'total': 0, 'function': 0, 'format': 0, 'data': 0, 'ec': 0,
+               'data_codewords': [], 'ec_codewords': []}
+
+    # Codewords past the data count are error correction; read the level
+    # from the current code and fall back to treating everything as data
+    format_info = read_format_info(current)
+    data_count = VERSION1_DATA_CODEWORDS[format_info[0]] if format_info and size == 21 else None
+    codeword_index = {pos: i // 8 for i, pos in enumerate(data_module_positions(size))}
+
+    for row in range(size):
+        for col in range(size):
+            if previous[row][col] == current[row][col]:
+                continue
+            summary['total'] += 1
+            if is_format_module(size, row, col):
+                summary['format'] += 1
+            elif is_function_module(size, row, col):
+                summary['function'] += 1
+            else:
+                index = codeword_index[(row, col)]
+                region = 'data' if data_count is None or index < data_count else 'ec'
+                summary[region] += 1
+                if index not in summary[f'{region}_codewords']:
+                    summary[f'{region}_codewords'].append(index)
+
+    summary['data_codewords'].sort()
+    summary['ec_codewords'].sort()
+    return summary
+
+
+def pack_matrix(matrix):
+    """Pack a module matrix row-major into bytes, most significant bit first"""
+    bits = ''.join('1' if dark else '0' for row in matrix for dark in row)
+    bits += '0' * ((-len(bits)) % 8)
+    return int(bits, 2).to_bytes(len(bits) // 8, 'big')
+
+
+def unpack_matrix(data, size=21):
+    """Inverse of pack_matrix for a size x size matrix"""
+    bits = ''.join(f'{byte:08b}' for byte in data)
+    if len(bits) < size * size:
+        raise ValueError(f"Need {size * size} bits, got {len(bits)}")
+    return [[bits[row * size + col] == '1' for col in range(size)] for row in range(size)]
+
+
+def _png_chunk(tag, data):
+    """Build a length-prefixed, CRC-suffixed PNG chunk"""
+    return (struct.pack('>I', len(data)) + tag + data +
+            struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+
+def matrix_to_png(matrix, scale=20, border=4, size=None):
+    """Render a module matrix as a 1-bit palette PNG (black and white)
+
+    Args:
+        matrix: Square list of lists of bools (True = dark)
+        scale: Pixels per module
+        border: Quiet zone width in modules
+        size: Canvas width and height in pixels; the code is centred and
+            the remainder is extra white margin (default: exact fit)
+
+    Returns:
+        PNG file bytes
+    """
+    code_width = (len(matrix) + 2 * border) * scale
+    width = max(size or code_width, code_width)
+    before = (width - code_width) // 2
+    after = width - code_width - before
+    padding = (-width) % 8
+    quiet = [False] * border
+
+    blank = b'\x00' + int('1' * (width + padding), 2).to_bytes((width + padding) // 8, 'big')
+    scanlines = [blank * before]
+    for line in [[False] * len(matrix)] * border + matrix + [[False] * len(matrix)] * border:
+        # Palette index 0 is black, 1 is white
+        bits = ('1' * before + ''.join(('0' if dark else '1') * scale for dark in quiet + line + quiet) +
+                '1' * (after + padding))
+        scanline = b'\x00' + int(bits, 2).to_bytes(len(bits) // 8, 'big')
+        scanlines.append(scanline * scale)
+    scanlines.append(blank * after)
+
+    header = struct.pack('>IIBBBBB', width, width, 1, 3, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' +
+            _png_chunk(b'IHDR', header) +
+            _png_chunk(b'PLTE', b'\x00\x00\x00\xff\xff\xff') +
+            _png_chunk(b'IDAT', zlib.compress(b''.join(scanlines), 9)) +
+            _png_chunk(b'IEND', b''))
+
+
+def matrix_to_svg(matrix, border=4):
+    """Render a module matrix as a minimal SVG with one rect per horizontal run
+
+    Args:
+        matrix: Square list of lists of bools (True = dark)
+        border: Quiet zone width in modules
+
+    Returns:
+        SVG markup that parse_svg_matrix reads back to the same matrix
+    """
+    size = len(matrix) + 2 * border
+    runs = []
+    for row, line in enumerate(matrix):
+        col = 0
+        while col < len(line):
+            if not line[col]:
+                col += 1
+                continue
+            start = col
+            while col < len(line) and line[col]:
+                col += 1
+            runs.append(f'<rect x="{start + border}" y="{row + border}" width="{col - start}" height="1"/>')
+
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+            f'<rect width="{size}" height="{size}" fill="#fff"/>{"".join(runs)}</svg>')
+
+
+def decode_svg(svg_content):
+    """Decode the payload of a rect-based QR SVG (None if undecodable)"""
+    matrix = parse_svg_matrix(svg_content)
+    return decode_matrix(matrix) if matrix else None
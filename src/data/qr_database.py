@@ -6,19 +6,32 @@ Creates a database of all scraped SVG QR codes with timestamps and metadata.
 
 import os
 import json
+import bisect
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
-def create_qr_database():
-    """Create a comprehensive database of all scraped QR code SVG files."""
-    
-    real_qr_codes_dir = Path("real_qr_codes")
-    
-    if not real_qr_codes_dir.exists():
-        print(f"Error: Directory {real_qr_codes_dir} not found")
-        return
-    
-    database = {
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+DATA_DIR = Path(__file__).resolve().parent
+DATABASE_FILE = DATA_DIR / "qr_code_database.json"
+SUMMARY_FILE = DATA_DIR / "qr_database_summary.md"
+REAL_QR_CODES_DIR = DATA_DIR.parent.parent / "real_qr_codes"
+
+# Serializes read-modify-write of a database between threads; the file
+# lock below does the same between processes (scraper and monitor)
+_database_lock = threading.Lock()
+
+
+def new_database():
+    """Create an empty database structure."""
+    return {
         "metadata": {
             "created": datetime.now().isoformat(),
             "total_files": 0,
@@ -33,91 +46,183 @@ def create_qr_database():
         },
         "files": []
     }
+
+
+def build_file_info(svg_file):
+    """Build the database entry for one SVG file, or None if its name is not a timestamp."""
+    svg_file = Path(svg_file)
+    filename = svg_file.name
+    timestamp_str = filename.replace('.svg', '')
+    
+    # Parse timestamp: YYYYMMDDHHMM or YYYYMMDDHHMMSS format
+    if len(timestamp_str) not in (12, 14):
+        return None
+    
+    year = int(timestamp_str[:4])
+    month = int(timestamp_str[4:6])
+    day = int(timestamp_str[6:8])
+    hour = int(timestamp_str[8:10])
+    minute = int(timestamp_str[10:12])
+    second = int(timestamp_str[12:14]) if len(timestamp_str) == 14 else 0
+    
+    # Create datetime object
+    dt = datetime(year, month, day, hour, minute, second)
+    
+    # Calculate 2-hour slot (0-11)
+    slot_number = hour // 2
+    slot_start_hour = slot_number * 2
+    slot_end_hour = slot_start_hour + 1
+    slot_label = f"{slot_start_hour:02d}00-{slot_end_hour:02d}59"
+    
+    return {
+        "filename": filename,
+        "timestamp": timestamp_str,
+        "datetime": dt.isoformat(),
+        "date": dt.strftime("%Y-%m-%d"),
+        "time": dt.strftime("%H:%M"),
+        "weekday": dt.strftime("%A"),
+        "file_size": svg_file.stat().st_size,
+        "year": year,
+        "month": month,
+        "day": day,
+        "hour": hour,
+        "minute": minute,
+        "slot_number": slot_number,
+        "slot_label": slot_label
+    }
+
+
+def update_metadata(database, file_info):
+    """Fold one file entry into the database metadata, keeping lists sorted."""
+    metadata = database["metadata"]
+    coverage = metadata["time_coverage"]
+    
+    date_str = file_info["date"]
+    if date_str not in coverage["unique_dates"]:
+        bisect.insort(coverage["unique_dates"], date_str)
+    
+    if file_info["hour"] not in coverage["hours"]:
+        bisect.insort(coverage["hours"], file_info["hour"])
+    
+    slots = coverage.setdefault("slots", [])
+    if file_info["slot_number"] not in slots:
+        bisect.insort(slots, file_info["slot_number"])
+    
+    # Update date range
+    dt_str = file_info["datetime"]
+    if metadata["date_range"]["earliest"] is None or dt_str < metadata["date_range"]["earliest"]:
+        metadata["date_range"]["earliest"] = dt_str
+    if metadata["date_range"]["latest"] is None or dt_str > metadata["date_range"]["latest"]:
+        metadata["date_range"]["latest"] = dt_str
+
+
+def write_json_atomic(path, data):
+    """Write JSON via a temp file and rename so readers never see a partial file."""
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file 0600; keep the database world-readable
+        os.chmod(tmp_path, path.stat().st_mode & 0o777 if path.exists() else 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def locked_database(database_file):
+    """Hold the database lock for a read-modify-write of database_file."""
+    database_file = Path(database_file)
+    with _database_lock:
+        if not HAS_FCNTL:
+            yield
+            return
+        lock_path = database_file.parent / f".{database_file.name}.lock"
+        with open(lock_path, 'a') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def add_file(svg_path, database_file=DATABASE_FILE):
+    """Add a single SVG file to the database without rebuilding it.
+    
+    Returns the file's database entry, or None if the filename is not a
+    timestamp. Files already in the database are left untouched. Safe to
+    call from several threads or processes at once.
+    """
+    file_info = build_file_info(svg_path)
+    if file_info is None:
+        return None
+    
+    database_file = Path(database_file)
+    with locked_database(database_file):
+        if database_file.exists():
+            with open(database_file, 'r') as f:
+                database = json.load(f)
+        else:
+            database = new_database()
+        
+        for existing in database["files"]:
+            if existing["filename"] == file_info["filename"]:
+                return existing
+        
+        # New scrapes are almost always the latest file, so this is an append
+        keys = [entry["datetime"] for entry in database["files"]]
+        database["files"].insert(bisect.bisect_right(keys, file_info["datetime"]), file_info)
+        
+        update_metadata(database, file_info)
+        database["metadata"]["total_files"] = len(database["files"])
+        database["metadata"]["updated"] = datetime.now().isoformat()
+        
+        write_json_atomic(database_file, database)
+    return file_info
+
+
+def create_qr_database():
+    """Create a comprehensive database of all scraped QR code SVG files."""
+    
+    real_qr_codes_dir = REAL_QR_CODES_DIR
+    
+    if not real_qr_codes_dir.exists():
+        print(f"Error: Directory {real_qr_codes_dir} not found")
+        return
+    
+    database = new_database()
     
     svg_files = sorted([f for f in real_qr_codes_dir.iterdir() if f.suffix == '.svg'])
     
     for svg_file in svg_files:
-        filename = svg_file.name
-        timestamp_str = filename.replace('.svg', '')
+        try:
+            file_info = build_file_info(svg_file)
+        except ValueError as e:
+            print(f"Warning: Could not parse timestamp from {svg_file.name}: {e}")
+            continue
         
-        # Parse timestamp: YYYYMMDDHHMMM format
-        if len(timestamp_str) == 12:
-            try:
-                year = int(timestamp_str[:4])
-                month = int(timestamp_str[4:6])
-                day = int(timestamp_str[6:8])
-                hour = int(timestamp_str[8:10])
-                minute = int(timestamp_str[10:12])
-                
-                # Create datetime object
-                dt = datetime(year, month, day, hour, minute)
-                
-                # Calculate 2-hour slot (0-11)
-                slot_number = hour // 2
-                slot_start_hour = slot_number * 2
-                slot_end_hour = slot_start_hour + 1
-                slot_label = f"{slot_start_hour:02d}00-{slot_end_hour:02d}59"
-                
-                # File info
-                file_info = {
-                    "filename": filename,
-                    "timestamp": timestamp_str,
-                    "datetime": dt.isoformat(),
-                    "date": dt.strftime("%Y-%m-%d"),
-                    "time": dt.strftime("%H:%M"),
-                    "weekday": dt.strftime("%A"),
-                    "file_size": svg_file.stat().st_size,
-                    "year": year,
-                    "month": month,
-                    "day": day,
-                    "hour": hour,
-                    "minute": minute,
-                    "slot_number": slot_number,
-                    "slot_label": slot_label
-                }
-                
-                database["files"].append(file_info)
-                
-                # Update metadata
-                date_str = dt.strftime("%Y-%m-%d")
-                if date_str not in database["metadata"]["time_coverage"]["unique_dates"]:
-                    database["metadata"]["time_coverage"]["unique_dates"].append(date_str)
-                
-                if hour not in database["metadata"]["time_coverage"]["hours"]:
-                    database["metadata"]["time_coverage"]["hours"].append(hour)
-                
-                if slot_number not in database["metadata"]["time_coverage"].get("slots", []):
-                    if "slots" not in database["metadata"]["time_coverage"]:
-                        database["metadata"]["time_coverage"]["slots"] = []
-                    database["metadata"]["time_coverage"]["slots"].append(slot_number)
-                
-                # Update date range
-                if database["metadata"]["date_range"]["earliest"] is None or dt < datetime.fromisoformat(database["metadata"]["date_range"]["earliest"]):
-                    database["metadata"]["date_range"]["earliest"] = dt.isoformat()
-                
-                if database["metadata"]["date_range"]["latest"] is None or dt > datetime.fromisoformat(database["metadata"]["date_range"]["latest"]):
-                    database["metadata"]["date_range"]["latest"] = dt.isoformat()
-                    
-            except ValueError as e:
-                print(f"Warning: Could not parse timestamp from {filename}: {e}")
-                continue
+        if file_info is None:
+            continue
+        
+        database["files"].append(file_info)
+        update_metadata(database, file_info)
     
     # Sort files by datetime
     database["files"].sort(key=lambda x: x["datetime"])
     
-    # Sort metadata lists
-    database["metadata"]["time_coverage"]["unique_dates"].sort()
-    database["metadata"]["time_coverage"]["hours"].sort()
-    if "slots" in database["metadata"]["time_coverage"]:
-        database["metadata"]["time_coverage"]["slots"].sort()
-    
     # Update total count
     database["metadata"]["total_files"] = len(database["files"])
     
     # Save database
-    database_file = Path("qr_code_database.json")
-    with open(database_file, 'w') as f:
-        json.dump(database, f, indent=2)
+    database_file = DATABASE_FILE
+    write_json_atomic(database_file, database)
     
     # Print summary
     print(f"QR Code Database Created: {database_file}")
@@ -161,7 +266,7 @@ def create_qr_database():
             slot_info = f" [Slot {file_info['slot_number']}: {file_info['slot_label']}]"
         summary.append(f"- {file_info['filename']} ({file_info['datetime']}) - {file_info['file_size']} bytes{slot_info}")
     
-    summary_file = Path("qr_database_summary.md")
+    summary_file = SUMMARY_FILE
     with open(summary_file, 'w') as f:
         f.write('\n'.join(summary))
     
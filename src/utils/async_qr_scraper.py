@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Rise Gym Multi-Account QR Scraper
+Scrapes several accounts concurrently with one shared Playwright browser
+"""
+
+import os
+import sys
+import json
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Add repository root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+try:
+    from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+except ImportError:
+    print("❌ Playwright not installed. Install with: pip install playwright && python -m playwright install")
+    sys.exit(1)
+
+from src.utils.qr_scraper import (
+    EMAIL_SELECTORS,
+    PASSWORD_SELECTORS,
+    LOGIN_BUTTON_SELECTORS,
+    DASHBOARD_READY_JS,
+    QR_RENDERED_JS,
+    SELECT_QR_SVG_JS,
+)
+
+LOGIN_URL = "https://risegyms.ez-runner.com/login.aspx"
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+def load_accounts(config_path):
+    """Load account list from a JSON config file
+
+    The file is either a list of accounts or an object with an "accounts"
+    list and an optional "max_concurrency". Each account has a "name" and
+    either literal "email"/"password" values or "email_env"/"password_env"
+    naming the environment variables that hold them.
+
+    Returns:
+        (accounts, max_concurrency) where accounts is a list of dicts with
+        name, email and password filled in
+    """
+    load_dotenv()
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+
+    if isinstance(config, list):
+        config = {'accounts': config}
+
+    accounts = []
+    for entry in config.get('accounts', []):
+        name = entry.get('name')
+        email = entry.get('email') or os.getenv(entry.get('email_env', ''), '')
+        password = entry.get('password') or os.getenv(entry.get('password_env', ''), '')
+        if not name or not email or not password:
+            raise ValueError(f"Account {name or '<unnamed>'} needs a name, email and password")
+        accounts.append({'name': name, 'email': email, 'password': password})
+
+    return accounts, config.get('max_concurrency')
+
+
+class AsyncMultiAccountScraper:
+    def __init__(self, accounts, output_dir="real_qr_codes", max_concurrency=3):
+        """
+        Initialize multi-account scraper
+
+        Args:
+            accounts: List of dicts with name, email and password
+            output_dir: Base directory; each account saves to output_dir/<name>
+            max_concurrency: Maximum number of browser contexts open at once
+        """
+        self.accounts = accounts
+        self.output_dir = Path(output_dir)
+        self.max_concurrency = max(1, max_concurrency)
+
+        for account in self.accounts:
+            (self.output_dir / account['name']).mkdir(parents=True, exist_ok=True)
+
+    async def scrape_all(self, headless=True, max_retries=3):
+        """Scrape every account, sharing one browser
+
+        Returns:
+            Dict mapping account name to saved filename (or None on failure)
+        """
+        print(f"🚀 Scraping {len(self.accounts)} account(s), {self.max_concurrency} at a time...")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(
+                headless=headless,
+                args=[
+                    '--disable-blink-features=AutomationControlled',
+                    '--disable-dev-shm-usage',
+                    '--no-sandbox'
+                ]
+            )
+            try:
+                results = await asyncio.gather(*[
+                    self._scrape_account(browser, semaphore, account, max_retries)
+                    for account in self.accounts
+                ])
+            finally:
+                await browser.close()
+
+        return {account['name']: result for account, result in zip(self.accounts, results)}
+
+    async def _scrape_account(self, browser, semaphore, account, max_retries):
+        """Scrape a single account with retry logic"""
+        name = account['name']
+        for attempt in range(max_retries):
+            if attempt > 0:
+                print(f"🔄 [{name}] Retry attempt {attempt + 1} of {max_retries}...")
+                await asyncio.sleep(5 * attempt)  # Progressive backoff
+
+            try:
+                async with semaphore:
+                    result = await self._scrape_attempt(browser, account)
+                if result:
+                    return result
+                print(f"⚠️  [{name}] Scrape attempt failed")
+            except Exception as e:
+                print(f"❌ [{name}] Error during scrape attempt {attempt + 1}: {type(e).__name__}: {e}")
+
+        return None
+
+    async def _scrape_attempt(self, browser, account):
+        """Single scrape attempt in a fresh browser context"""
+        name = account['name']
+        context = await browser.new_context(
+            viewport={'width': 1920, 'height': 1080},
+            user_agent=USER_AGENT
+        )
+        try:
+            page = await context.new_page()
+
+            print(f"📱 [{name}] Navigating to Rise Gym login...")
+            await page.goto(LOGIN_URL, wait_until='networkidle')
+
+            if not await self._fill_first(page, EMAIL_SELECTORS, account['email']):
+                raise Exception("Could not find email input field")
+            if not await self._fill_first(page, PASSWORD_SELECTORS, account['password']):
+                raise Exception("Could not find password input field")
+
+            print(f"🚪 [{name}] Submitting login form...")
+            if not await self._click_first(page, LOGIN_BUTTON_SELECTORS):
+                await page.keyboard.press('Enter')
+
+            # Leave the login page first - the ready predicate alone can pass
+            # before the redirect starts
+            try:
+                await page.wait_for_url(lambda url: "login" not in url.lower(), timeout=15000)
+            except PlaywrightTimeout:
+                print(f"⚠️  [{name}] Still on login page - authentication may have failed")
+                return None
+
+            try:
+                await page.wait_for_function(DASHBOARD_READY_JS, timeout=15000)
+            except PlaywrightTimeout:
+                print(f"⚠️  [{name}] Timeout waiting for dashboard, checking current state...")
+
+            try:
+                await page.wait_for_function(QR_RENDERED_JS, timeout=10000)
+            except PlaywrightTimeout:
+                print(f"⚠️  [{name}] Timeout waiting for QR code to render fully")
+
+            selection = await page.evaluate(SELECT_QR_SVG_JS)
+            qr_svg = selection['html']
+            if not qr_svg:
+                print(f"❌ [{name}] No valid QR code SVG found (need 200+ rectangles)")
+                return None
+
+            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+            filename = self.output_dir / name / f"{timestamp}.svg"
+            with open(filename, 'w') as f:
+                f.write(qr_svg)
+
+            print(f"💾 [{name}] QR code saved: {filename} ({selection['rects']} rectangles)")
+            return str(filename)
+        finally:
+            await context.close()
+
+    async def _fill_first(self, page, selectors, value):
+        """Fill the first selector that appears on the page"""
+        for selector in selectors:
+            try:
+                await page.wait_for_selector(selector, timeout=2000)
+                await page.fill(selector, value)
+                return True
+            except Exception:
+                continue
+        return False
+
+    async def _click_first(self, page, selectors):
+        """Click the first selector present on the page"""
+        for selector in selectors:
+            try:
+                if await page.query_selector(selector):
+                    await page.click(selector)
+                    return True
+            except Exception:
+                continue
+        return False
+
+
+def main():
+    """Main function"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Rise Gym Multi-Account QR Scraper')
+    parser.add_argument('config', help='JSON file listing accounts to scrape')
+    parser.add_argument('--output-dir', default='real_qr_codes',
+                       help='Base directory for per-account QR codes (default: real_qr_codes)')
+    parser.add_argument('--concurrency', type=int, default=None,
+                       help='Maximum concurrent browser contexts (default: config value or 3)')
+    parser.add_argument('--retries', type=int, default=3,
+                       help='Number of retry attempts per account (default: 3)')
+    parser.add_argument('--debug', action='store_true',
+                       help='Run in debug mode (visible browser)')
+
+    args = parser.parse_args()
+
+    try:
+        accounts, config_concurrency = load_accounts(args.config)
+    except (OSError, ValueError) as e:
+        print(f"💥 Could not load accounts: {e}")
+        return False
+
+    if not accounts:
+        print("❌ No accounts configured")
+        return False
+
+    scraper = AsyncMultiAccountScraper(
+        accounts,
+        output_dir=args.output_dir,
+        max_concurrency=args.concurrency or config_concurrency or 3
+    )
+    results = asyncio.run(scraper.scrape_all(headless=not args.debug, max_retries=args.retries))
+
+    print("\n📊 Results:")
+    for name, result in results.items():
+        print(f"   {'✅' if result else '❌'} {name}: {result or 'failed'}")
+
+    return all(results.values())
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Firebase History Backfill
+Streams stored QR codes into /qr_codes with chunked multi-path updates
+
+Entries are batched into root PATCHes, sent from a bounded thread pool
+under a token-bucket rate limit, and checkpointed after every chunk so an
+interrupted run resumes where it stopped. /latest is left untouched.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# Add repository root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.data.qr_database import write_json_atomic
+from src.utils.firebase_uploader import DEFAULT_KEEP_COUNT, uploader_from_env, pattern_from_timestamp
+from src.utils.metrics_registry import export_from_env
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = '.firebase_backfill_checkpoint.json'
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = None):
+        """
+        Initialize rate limiter
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity (default: max(1, rate))
+        """
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            # Sleep without the lock so other workers can refill and check too
+            time.sleep(wait)
+
+
+def scan_codes(qr_dir: Path, dedupe: bool = False) -> list:
+    """
+    List stored codes oldest first
+
+    Args:
+        qr_dir: Directory of YYYYMMDDHHMMSS.svg files
+        dedupe: Drop files identical to the previous kept file
+
+    Returns:
+        List of (timestamp, path) tuples
+    """
+    with os.scandir(qr_dir) as entries:
+        names = sorted(entry.name for entry in entries
+                       if entry.name.endswith('.svg') and entry.is_file())
+
+    codes = []
+    previous_hash = None
+    for name in names:
+        path = qr_dir / name
+        if dedupe:
+            with open(path, 'rb') as f:
+                content_hash = hashlib.md5(f.read()).hexdigest()
+            if content_hash == previous_hash:
+                continue
+            previous_hash = content_hash
+        codes.append((path.stem, path))
+    return codes
+
+
+class HistoryBackfill:
+    def __init__(self, uploader, qr_dir: str = 'real_qr_codes', chunk_size: int = 25,
+                 workers: int = 4, rate: float = 5.0, checkpoint_file: str = DEFAULT_CHECKPOINT,
+                 dedupe: bool = False):
+        """
+        Initialize backfill
+
+        Args:
+            uploader: FirebaseUploader used to build records and send requests
+            qr_dir: Directory of stored SVGs
+            chunk_size: History entries per PATCH
+            workers: Concurrent requests
+            rate: Requests per second across all workers
+            checkpoint_file: Where completed timestamps are recorded
+            dedupe: Skip files identical to the previous stored file
+        """
+        self.uploader = uploader
+        self.qr_dir = Path(qr_dir)
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.bucket = TokenBucket(rate)
+        self.checkpoint_file = Path(checkpoint_file)
+        self.dedupe = dedupe
+
+    def load_checkpoint(self) -> set:
+        """Timestamps already uploaded to this database"""
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return set()
+        if checkpoint.get('databaseUrl') != self.uploader.database_url:
+            return set()
+        return set(checkpoint.get('done', []))
+
+    def save_checkpoint(self, done: set):
+        """Record uploaded timestamps atomically"""
+        write_json_atomic(self.checkpoint_file, {
+            'databaseUrl': self.uploader.database_url,
+            'done': sorted(done)
+        })
+
+    def upload_chunk(self, chunk: list) -> bool:
+        """Build and send one multi-path PATCH for a chunk of codes"""
+        update = {}
+        for timestamp, path in chunk:
+            with open(path, 'r', encoding='utf-8') as f:
+                svg_content = f.read()
+            content_hash = hashlib.md5(svg_content.encode('utf-8')).hexdigest()
+            try:
+                pattern = pattern_from_timestamp(timestamp)
+            except ValueError:
+                pattern = timestamp  # Fallback to timestamp
+            record = self.uploader.build_record(path, svg_content, content_hash, pattern)
+            update[f'qr_codes/{timestamp}'] = self.uploader.history_entry(record)
+
+        self.bucket.acquire()
+        response, raw_bytes, wire_bytes = self.uploader.send_json('PATCH', ".json", update)
+        if response.status_code not in [200, 204]:
+            logger.error(f"Chunk {chunk[0][0]}..{chunk[-1][0]} failed: {response.status_code} - {response.text}")
+            return False
+        logger.info(f"Chunk {chunk[0][0]}..{chunk[-1][0]}: {len(chunk)} entries "
+                    f"({raw_bytes} bytes, {wire_bytes} on the wire)")
+        return True
+
+    def run(self) -> tuple:
+        """
+        Upload every stored code not yet in the checkpoint
+
+        Returns:
+            (uploaded, failed) entry counts for this run
+        """
+        codes = scan_codes(self.qr_dir, self.dedupe)
+        done = self.load_checkpoint()
+        pending = [code for code in codes if code[0] not in done]
+        chunks = [pending[i:i + self.chunk_size] for i in range(0, len(pending), self.chunk_size)]
+        logger.info(f"{len(pending)} of {len(codes)} codes to upload in {len(chunks)} chunks "
+                    f"({self.workers} workers, {self.bucket.rate}/s)")
+
+        uploaded = failed = 0
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = {pool.submit(self.upload_chunk, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    ok = future.result()
+                except Exception as e:
+                    logger.error(f"Chunk {chunk[0][0]}..{chunk[-1][0]} failed: {e}")
+                    ok = False
+
+                if ok:
+                    uploaded += len(chunk)
+                    done.update(timestamp for timestamp, _ in chunk)
+                    self.save_checkpoint(done)
+                else:
+                    failed += len(chunk)
+        except KeyboardInterrupt:
+            logger.warning("Interrupted - progress is checkpointed, rerun to resume")
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+        finally:
+            pool.shutdown(wait=True)
+
+        logger.info(f"Backfill finished: {uploaded} uploaded, {failed} failed")
+        return uploaded, failed
+
+
+def main():
+    """Command line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Backfill stored QR codes into Firebase /qr_codes')
+    parser.add_argument('--dir', default='real_qr_codes',
+                       help='Directory of stored SVGs (default: real_qr_codes)')
+    parser.add_argument('--chunk-size', type=int, default=25,
+                       help='History entries per request (default: 25)')
+    parser.add_argument('--workers', type=int, default=4,
+                       help='Concurrent requests (default: 4)')
+    parser.add_argument('--rate', type=float, default=5.0,
+                       help='Requests per second (default: 5)')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT,
+                       help=f'Checkpoint file (default: {DEFAULT_CHECKPOINT})')
+    parser.add_argument('--dedupe', action='store_true',
+                       help='Skip files identical to the previous stored file')
+    parser.add_argument('--reset', action='store_true',
+                       help='Ignore the checkpoint and upload everything')
+
+    args = parser.parse_args()
+
+    uploader = uploader_from_env(pool_size=args.workers)
+    if not uploader:
+        logger.error("FIREBASE_DATABASE_URL environment variable not set")
+        sys.exit(1)
+
+    export_from_env()
+
+    # The scheduled upload trims /qr_codes after every new code
+    keep_count = int(os.environ.get('FIREBASE_KEEP_COUNT') or DEFAULT_KEEP_COUNT)
+    if keep_count > 0:
+        logger.warning(f"The scheduled upload keeps only the newest {keep_count} /qr_codes entries "
+                       f"and will delete the rest of this backfill; set the FIREBASE_KEEP_COUNT "
+                       f"repository variable to 0 (or above the history size) to keep it")
+
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    backfill = HistoryBackfill(uploader, args.dir, args.chunk_size, args.workers,
+                               args.rate, args.checkpoint, args.dedupe)
+    try:
+        _, failed = backfill.run()
+    except KeyboardInterrupt:
+        sys.exit(130)
+    finally:
+        uploader.close()
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Firebase Upcoming Slot Publisher
+Announces the next days' slots under /upcoming/{slot}
+
+Predicted entries carry the generator's payload and compact bits for
+the slot, marked predicted: true and confirmed: false. The payload's
+trailing MMSS is a revision counter the gym bumps within a slot and the
+generator's guess matches only about 69% of archived codes, so clients
+should treat a predicted code as a prefetch hint and prefer /latest once
+the slot has been scraped. The uploader replaces an entry with a
+confirmed one (contentHash plus a qr_codes/{timestamp} pointer) when a
+scrape verifies the slot, and each run here prunes slots that ended.
+"""
+
+import os
+import sys
+import base64
+import logging
+from datetime import datetime, timedelta
+
+# Add repository root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.qr_generator import RiseGymQRGenerator
+from src.core.qr_matrix import parse_svg_matrix, pack_matrix
+from src.utils.firebase_uploader import RECORD_FORMAT_VERSION, uploader_from_env
+from src.utils.scrape_scheduler import SLOT_PREFIX_LENGTH, DEFAULT_GYM_TIMEZONE, slot_window
+from src.utils.metrics_registry import export_from_env
+
+logger = logging.getLogger(__name__)
+
+SLOTS_PER_DAY = 12
+
+
+def upcoming_slot_starts(generator, days=1, now=None):
+    """
+    Start times of the current slot and the following ones
+
+    Args:
+        generator: RiseGymQRGenerator (its timezone defines the slots)
+        days: Days of slots to cover
+        now: Aware datetime to start from (default: current time)
+
+    Returns:
+        List of aware datetimes, one per 2-hour slot
+    """
+    tz = generator.timezone
+    now = (now or datetime.now(tz)).astimezone(tz)
+
+    # Step on naive wall-clock time so slots stay on even hours across DST
+    wall = now.replace(tzinfo=None, hour=(now.hour // 2) * 2, minute=0, second=0, microsecond=0)
+    return [tz.localize(wall + timedelta(hours=2 * i)) for i in range(days * SLOTS_PER_DAY)]
+
+
+def build_upcoming(generator, slot_start):
+    """
+    Build one predicted slot entry (see above)
+    
+    Returns:
+        Tuple of (slot key, upcoming entry)
+    """
+    payload = generator.generate_qr_data(slot_start)
+    matrix = parse_svg_matrix(generator.generate_svg_native(payload))
+    slot = payload[:SLOT_PREFIX_LENGTH]
+    start, end = slot_window(slot, generator.timezone.zone)
+    return slot, {
+        'slotPrefix': slot,
+        'predicted': True,
+        'confirmed': False,
+        'slotStart': int(start.timestamp() * 1000),
+        'slotEnd': int(end.timestamp() * 1000),
+        'payload': payload,
+        'formatVersion': RECORD_FORMAT_VERSION,
+        'matrixSize': len(matrix),
+        'bits': base64.b64encode(pack_matrix(matrix)).decode('ascii')
+    }
+
+
+def publish_upcoming(uploader, days=1, force=False, timezone=None, now=None):
+    """
+    Publish predicted slots for the next days in one batched write
+
+    Slots already under /upcoming are left alone (a scrape may have
+    confirmed them) unless force is set; slots that have ended are
+    removed in the same write.
+
+    Returns:
+        True if successful
+    """
+    generator = RiseGymQRGenerator(timezone or os.getenv('RISE_GYM_TIMEZONE', DEFAULT_GYM_TIMEZONE))
+    now = now or datetime.now(generator.timezone)
+
+    existing = uploader.list_upcoming()
+    if existing is None:
+        return False
+
+    expired = uploader.expired_upcoming(existing, now)
+
+    entries = {}
+    for slot_start in upcoming_slot_starts(generator, days, now):
+        slot, entry = build_upcoming(generator, slot_start)
+        if force or slot not in existing:
+            entries[slot] = entry
+
+    if not entries and not expired:
+        logger.info("Upcoming slots already published")
+        return True
+    return uploader.publish_upcoming(entries, expired)
+
+
+def main():
+    """Command line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Pre-publish upcoming slots to Firebase /upcoming')
+    parser.add_argument('--days', type=int, default=1,
+                       help='Days of slots to publish (default: 1)')
+    parser.add_argument('--force', action='store_true',
+                       help='Overwrite slots that are already published')
+
+    args = parser.parse_args()
+
+    uploader = uploader_from_env()
+    if not uploader:
+        logger.error("FIREBASE_DATABASE_URL environment variable not set")
+        sys.exit(1)
+
+    export_from_env()
+
+    try:
+        if not publish_upcoming(uploader, args.days, args.force):
+            sys.exit(1)
+    finally:
+        uploader.close()
+
+if __name__ == "__main__":
+    main()
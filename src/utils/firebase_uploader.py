@@ -7,21 +7,38 @@ Uploads QR codes to Firebase Realtime Database for instant mobile app updates
 import os
 import sys
 import json
+import time
+import gzip
 import base64
+import hashlib
+import random
 import logging
-from datetime import datetime
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
 from PIL import Image
 import io
 
-# Try to import cairosvg, but don't fail if it's not available
+# Add repository root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.qr_matrix import parse_svg_matrix, decode_matrix, pack_matrix, matrix_to_png
+from src.utils.scrape_scheduler import SLOT_PREFIX_LENGTH, slot_window
+from src.utils.metrics_registry import (
+    UPLOADS, UPLOAD_FAILURES, UPLOAD_SKIPS, UPLOAD_BYTES, UPLOAD_RAW_BYTES, UPLOAD_SECONDS,
+    export_from_env
+)
+
+# Optional fallback for SVGs without a readable module grid
 try:
     import cairosvg
     HAS_CAIROSVG = True
-except ImportError:
+except (ImportError, OSError):
     HAS_CAIROSVG = False
-    logging.warning("cairosvg not available - bitmap generation will be skipped")
 
 # Configure logging
 logging.basicConfig(
@@ -30,82 +47,379 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# (connect, read) timeouts in seconds for every Firebase request
+REQUEST_TIMEOUT = (5, 30)
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# What /qr_codes/{timestamp} stores: "full" copies the whole record (the
+# Android app reads svgContent from history), "slim" keeps only metadata
+HISTORY_MODES = ('full', 'slim')
+SLIM_HISTORY_FIELDS = ('timestamp', 'pattern', 'uploadedAt', 'contentHash',
+                       'formatVersion', 'matrixSize', 'bits', 'payload')
+
+# Version of the compact record fields (bits, matrixSize, payload)
+RECORD_FORMAT_VERSION = 1
+
+# /qr_codes entries the scheduled upload keeps (FIREBASE_KEEP_COUNT)
+DEFAULT_KEEP_COUNT = 50
+
+# Remembers the last uploaded content hash so unchanged runs skip the network
+DEFAULT_UPLOAD_CACHE = '.firebase_upload_cache.json'
+
+# Bitmaps are drawn at the largest integer module scale that fits this size
+BITMAP_SIZE = 800
+BITMAP_BORDER = 4
+BITMAP_CACHE_SIZE = 256
+
+# SVG markup is long runs of near-identical <rect> elements, so gzip
+# shrinks it by an order of magnitude
+GZIP_LEVEL = 9
+
 class FirebaseUploader:
-    def __init__(self, database_url: str, auth_token: str = None):
+    def __init__(self, database_url: str, auth_token: str = None,
+                 max_retries: int = 4, backoff_base: float = 0.5, backoff_cap: float = 30.0,
+                 timeout: tuple = REQUEST_TIMEOUT, pool_size: int = 8,
+                 history_mode: str = 'full', cache_file: str = None,
+                 include_svg: bool = True, include_bitmap: bool = True,
+                 include_svg_gz: bool = False, compress_requests: bool = False):
         """
         Initialize Firebase uploader
         
         Args:
             database_url: Firebase Realtime Database URL
             auth_token: Optional authentication token
+            max_retries: Retries after a connection error, 429 or 5xx
+            backoff_base: First backoff ceiling in seconds (doubles per retry)
+            backoff_cap: Longest wait between retries in seconds
+            timeout: (connect, read) timeout in seconds
+            pool_size: Keep-alive connections kept open to the database host
+            history_mode: "full" or "slim" history entries (see HISTORY_MODES)
+            cache_file: Last-upload cache (default: FIREBASE_UPLOAD_CACHE or
+                .firebase_upload_cache.json)
+            include_svg: Store the full svgContent alongside the compact bits
+            include_bitmap: Render and store bitmapBase64
+            include_svg_gz: Store svgContentGz (base64 gzip of the SVG)
+            compress_requests: Send request bodies gzip-encoded (only for
+                endpoints that accept Content-Encoding: gzip)
         """
+        if history_mode not in HISTORY_MODES:
+            raise ValueError(f"history_mode must be one of {HISTORY_MODES}, got {history_mode!r}")
         self.database_url = database_url.rstrip('/')
         self.auth_token = auth_token
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.history_mode = history_mode
+        self.cache_file = Path(cache_file or os.environ.get('FIREBASE_UPLOAD_CACHE', DEFAULT_UPLOAD_CACHE))
+        self.last_skipped = False
+        self.include_svg = include_svg
+        self.include_bitmap = include_bitmap
+        self.include_svg_gz = include_svg_gz
+        self.compress_requests = compress_requests
+        self.bitmap_cache = OrderedDict()
+        # Backfill workers share the cache; OrderedDict LRU updates are not atomic
+        self.bitmap_lock = threading.Lock()
         
-    def upload_qr_code(self, svg_path: str, pattern: str) -> bool:
+        # One pooled session so every request reuses a warm TLS connection
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if auth_token:
+            self.session.headers['Authorization'] = f'Bearer {auth_token}'
+    
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+    
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Send a request to the database, retrying transient failures
+        
+        Retries connection errors, timeouts, 429 and 5xx responses with
+        full-jitter exponential backoff, honoring Retry-After when sent.
+        
+        Args:
+            method: HTTP method
+            path: Path below the database URL (e.g. "latest.json")
+            **kwargs: Passed to requests.Session.request
+            
+        Returns:
+            The final response (which may still be an error status)
+            
+        Raises:
+            requests.RequestException: If the last attempt could not connect
+        """
+        url = f"{self.database_url}/{path}"
+        kwargs.setdefault('timeout', self.timeout)
+        body_size = len(kwargs.get('data') or b'')
+        
+        for attempt in range(self.max_retries + 1):
+            # Every attempt resends the body, so wire bytes count per attempt
+            UPLOAD_BYTES.inc(body_size)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"{method} {path} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                logger.warning(f"{method} {path} returned {response.status_code}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+    
+    def send_json(self, method: str, path: str, value) -> tuple:
+        """
+        Send a JSON body without echoing it back
+        
+        Serializes compactly, gzips when compress_requests is set, and asks
+        for an empty 204 reply (print=silent) instead of a copy of the
+        body. Raw bytes are counted once here; wire bytes are counted by
+        request() on every attempt.
+        
+        Returns:
+            (response, raw_bytes, wire_bytes) for this call - returned
+            rather than stored so concurrent callers never share them
+        """
+        raw = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        body = raw
+        if self.compress_requests:
+            body = gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+            headers['Content-Encoding'] = 'gzip'
+        
+        UPLOAD_RAW_BYTES.inc(len(raw))
+        response = self.request(method, path, data=body, headers=headers, params={'print': 'silent'})
+        return response, len(raw), len(body)
+    
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a retry attempt"""
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+    
+    def _retry_after(self, response: requests.Response):
+        """Delay requested by a Retry-After header (seconds or HTTP date), capped"""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(self.backoff_cap, max(0.0, delay))
+        
+    def upload_qr_code(self, svg_path: str, pattern: str, force: bool = False) -> bool:
         """
         Upload QR code to Firebase with both SVG and bitmap versions
         
+        Skips rendering and upload when /latest already holds the same
+        content (see is_current).
+        
         Args:
             svg_path: Path to SVG file
             pattern: QR code pattern (e.g., "926806082025120000")
+            force: Upload even if the content is unchanged
             
         Returns:
-            True if successful, False otherwise
+            True if successful or already up to date, False otherwise
         """
+        self.last_skipped = False
         try:
             # Read SVG content
             with open(svg_path, 'r', encoding='utf-8') as f:
                 svg_content = f.read()
+        except OSError as e:
+            logger.error(f"Error reading QR code: {e}")
+            UPLOAD_FAILURES.inc()
+            return False
+        
+        content_hash = hashlib.md5(svg_content.encode('utf-8')).hexdigest()
+        if not force and self.is_current(content_hash):
+            logger.info(f"Latest already holds {content_hash}, skipping upload")
+            UPLOAD_SKIPS.inc()
+            self.last_skipped = True
+            return True
+        
+        UPLOADS.inc()
+        with UPLOAD_SECONDS.time():
+            success = self._upload_qr_code(svg_path, svg_content, content_hash, pattern)
+        if success:
+            self.remember_upload(content_hash)
+        else:
+            UPLOAD_FAILURES.inc()
+        return success
+    
+    def is_current(self, content_hash: str) -> bool:
+        """
+        Check whether /latest already holds this content
+        
+        Checks the local cache first (no network), then the small
+        latest/contentHash field.
+        """
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+            if cache.get('databaseUrl') == self.database_url and cache.get('contentHash') == content_hash:
+                return True
+        except (OSError, ValueError):
+            pass
+        
+        try:
+            response = self.request('GET', "latest/contentHash.json")
+        except requests.RequestException as e:
+            logger.warning(f"Could not read latest content hash: {e}")
+            return False
+        
+        if response.status_code == 200 and response.json() == content_hash:
+            self.remember_upload(content_hash)
+            return True
+        return False
+    
+    def remember_upload(self, content_hash: str):
+        """Cache the hash of the content now in /latest"""
+        try:
+            with open(self.cache_file, 'w') as f:
+                json.dump({'databaseUrl': self.database_url, 'contentHash': content_hash}, f)
+        except OSError as e:
+            logger.warning(f"Could not write upload cache: {e}")
+    
+    def render_bitmap(self, svg_content: str, matrix, content_hash: str) -> str:
+        """
+        Render the QR code as a base64 PNG
+        
+        Draws the module matrix directly as a 1-bit palette PNG at an
+        integer module scale, centred on a BITMAP_SIZE canvas, so output is
+        identical on every machine. cairosvg is only used for SVGs without
+        a readable module grid. Renders are cached in memory by content
+        hash, which only helps long-lived callers such as the backfill.
+        
+        Returns:
+            Base64 PNG, or "" if no renderer could handle the SVG
+        """
+        with self.bitmap_lock:
+            if content_hash in self.bitmap_cache:
+                self.bitmap_cache.move_to_end(content_hash)
+                return self.bitmap_cache[content_hash]
+        
+        if matrix:
+            scale = max(1, BITMAP_SIZE // (len(matrix) + 2 * BITMAP_BORDER))
+            png_data = matrix_to_png(matrix, scale=scale, border=BITMAP_BORDER, size=BITMAP_SIZE)
+        elif HAS_CAIROSVG:
+            try:
+                png_data = cairosvg.svg2png(
+                    bytestring=svg_content.encode('utf-8'),
+                    output_width=BITMAP_SIZE,
+                    output_height=BITMAP_SIZE,
+                    dpi=300
+                )
+            except Exception as e:
+                logger.warning(f"Failed to generate bitmap: {e}")
+                return ""
+        else:
+            logger.warning("Skipping bitmap generation (no module grid and cairosvg not available)")
+            return ""
+        
+        # Convert PNG to base64 for storage
+        bitmap_base64 = base64.b64encode(png_data).decode('utf-8')
+        logger.info(f"Generated bitmap: {len(bitmap_base64)} chars")
+        
+        with self.bitmap_lock:
+            self.bitmap_cache[content_hash] = bitmap_base64
+            if len(self.bitmap_cache) > BITMAP_CACHE_SIZE:
+                self.bitmap_cache.popitem(last=False)
+        return bitmap_base64
+    
+    def build_record(self, svg_path: str, svg_content: str, content_hash: str, pattern: str) -> dict:
+        """
+        Build the database record for one QR code
+        
+        Args:
+            svg_path: Path to SVG file (its stem is the record timestamp)
+            svg_content: SVG markup
+            content_hash: md5 of svg_content
+            pattern: QR code pattern
             
-            # Generate high-quality PNG bitmap from SVG if cairosvg is available
-            bitmap_base64 = ""
-            if HAS_CAIROSVG:
-                try:
-                    png_data = cairosvg.svg2png(
-                        bytestring=svg_content.encode('utf-8'),
-                        output_width=800,
-                        output_height=800,
-                        dpi=300
-                    )
-                    # Convert PNG to base64 for storage
-                    bitmap_base64 = base64.b64encode(png_data).decode('utf-8')
-                    logger.info(f"Generated bitmap: {len(bitmap_base64)} chars")
-                except Exception as e:
-                    logger.warning(f"Failed to generate bitmap: {e}")
-            else:
-                logger.warning("Skipping bitmap generation (cairosvg not available)")
-            
-            # Extract timestamp from filename
-            filename = os.path.basename(svg_path)
-            timestamp = filename.replace('.svg', '')
-            
-            # Prepare data with both SVG and bitmap
-            qr_data = {
-                'timestamp': timestamp,
-                'svgContent': svg_content,
-                'bitmapBase64': bitmap_base64,
-                'pattern': pattern,
-                'uploadedAt': int(datetime.now().timestamp() * 1000)  # milliseconds
-            }
+        Returns:
+            Record with metadata, compact bits and the enabled renderings
+        """
+        matrix = parse_svg_matrix(svg_content)
+        
+        # Extract timestamp from filename
+        filename = os.path.basename(svg_path)
+        timestamp = filename.replace('.svg', '')
+        
+        # Prepare data: metadata plus whichever renderings are enabled
+        qr_data = {
+            'timestamp': timestamp,
+            'pattern': pattern,
+            'contentHash': content_hash,
+            'uploadedAt': int(datetime.now().timestamp() * 1000)  # milliseconds
+        }
+        
+        # Compact form: module bits row-major, most significant bit
+        # first, base64 encoded (76 chars for a 21x21 code)
+        if matrix:
+            qr_data.update({
+                'formatVersion': RECORD_FORMAT_VERSION,
+                'matrixSize': len(matrix),
+                'bits': base64.b64encode(pack_matrix(matrix)).decode('ascii'),
+                'payload': decode_matrix(matrix)
+            })
+        
+        # Without a module grid the SVG is the only usable rendering
+        if self.include_svg or not matrix:
+            qr_data['svgContent'] = svg_content
+        if self.include_bitmap:
+            qr_data['bitmapBase64'] = self.render_bitmap(svg_content, matrix, content_hash)
+        if self.include_svg_gz:
+            # mtime=0 keeps the encoding identical for identical content
+            svg_gz = gzip.compress(svg_content.encode('utf-8'), compresslevel=GZIP_LEVEL, mtime=0)
+            qr_data['svgContentGz'] = base64.b64encode(svg_gz).decode('ascii')
+        
+        return qr_data
+    
+    def history_entry(self, qr_data: dict) -> dict:
+        """The /qr_codes/{timestamp} entry for a record (see HISTORY_MODES)"""
+        if self.history_mode == 'full':
+            return qr_data
+        return {key: qr_data[key] for key in SLIM_HISTORY_FIELDS if key in qr_data}
+    
+    def _upload_qr_code(self, svg_path: str, svg_content: str, content_hash: str, pattern: str) -> bool:
+        """Render and upload one QR code (see upload_qr_code)"""
+        try:
+            qr_data = self.build_record(svg_path, svg_content, content_hash, pattern)
+            timestamp = qr_data['timestamp']
             
             # Upload to Firebase
-            # Update both /latest and /qr_codes/{timestamp}
-            urls = [
-                f"{self.database_url}/latest.json",
-                f"{self.database_url}/qr_codes/{timestamp}.json"
-            ]
-            
-            headers = {'Content-Type': 'application/json'}
-            if self.auth_token:
-                headers['Authorization'] = f'Bearer {self.auth_token}'
-            
-            for url in urls:
-                response = requests.put(url, json=qr_data, headers=headers)
-                if response.status_code not in [200, 201]:
-                    logger.error(f"Failed to upload to {url}: {response.status_code} - {response.text}")
-                    return False
-                logger.info(f"Successfully uploaded to {url}")
+            # Update /latest and /qr_codes/{timestamp} in one atomic
+            # multi-location update at the root
+            update = {
+                'latest': qr_data,
+                f'qr_codes/{timestamp}': self.history_entry(qr_data)
+            }
+            
+            # A verified scrape replaces its slot's predicted /upcoming
+            # entry; ended slots are pruned by the upcoming publisher
+            upcoming = self.upcoming_entry(qr_data)
+            if upcoming:
+                update[f"upcoming/{upcoming['slotPrefix']}"] = upcoming
+            
+            response, raw_bytes, wire_bytes = self.send_json('PATCH', ".json", update)
+            if response.status_code not in [200, 201, 204]:
+                logger.error(f"Failed to upload: {response.status_code} - {response.text}")
+                return False
+            logger.info(f"Successfully uploaded latest and qr_codes/{timestamp} "
+                        f"({raw_bytes} bytes, {wire_bytes} on the wire)")
             
             return True
             
@@ -113,54 +427,196 @@ class FirebaseUploader:
             logger.error(f"Error uploading QR code: {e}")
             return False
     
+    def upcoming_entry(self, qr_data: dict) -> dict:
+        """
+        The confirmed /upcoming/{slot} entry for a scraped record
+        
+        Carries the slot prefix and window (epoch milliseconds) plus the
+        record's contentHash and timestamp, which points at
+        qr_codes/{timestamp}; the record itself is already in /latest.
+        
+        Returns:
+            Entry, or None if the record has no decodable slot
+        """
+        payload = qr_data.get('payload') or ''
+        try:
+            start, end = slot_window(payload)
+        except ValueError:
+            return None
+        return {
+            'slotPrefix': payload[:SLOT_PREFIX_LENGTH],
+            'confirmed': True,
+            'slotStart': int(start.timestamp() * 1000),
+            'slotEnd': int(end.timestamp() * 1000),
+            'contentHash': qr_data['contentHash'],
+            'timestamp': qr_data['timestamp']
+        }
+    
+    def list_upcoming(self) -> list:
+        """
+        Slot keys currently under /upcoming (shallow read)
+        
+        Returns:
+            List of slot keys, or None if the read failed
+        """
+        try:
+            response = self.request('GET', "upcoming.json", params={'shallow': 'true'})
+        except requests.RequestException as e:
+            logger.error(f"Could not list upcoming slots: {e}")
+            return None
+        if response.status_code != 200:
+            logger.error(f"Could not list upcoming slots: {response.status_code}")
+            return None
+        return list((response.json() or {}).keys())
+    
+    def expired_upcoming(self, slots: list, now: datetime = None) -> list:
+        """Slot keys whose slot has ended (keys that are not slots are kept)"""
+        now = now or datetime.now(timezone.utc)
+        expired = []
+        for slot in slots:
+            try:
+                _, end = slot_window(slot)
+            except ValueError:
+                continue
+            if end <= now:
+                expired.append(slot)
+        return expired
+    
+    def publish_upcoming(self, entries: dict, expired: list = ()) -> bool:
+        """
+        Write upcoming slot entries and drop ended slots in one multi-path update
+        
+        Args:
+            entries: Slot key -> entry (see upcoming_entry)
+            expired: Slot keys to delete
+            
+        Returns:
+            True if successful
+        """
+        update = {f'upcoming/{slot}': entry for slot, entry in entries.items()}
+        update.update({f'upcoming/{slot}': None for slot in expired})
+        if not update:
+            return True
+        
+        try:
+            response, raw_bytes, wire_bytes = self.send_json('PATCH', ".json", update)
+        except requests.RequestException as e:
+            logger.error(f"Error publishing upcoming slots: {e}")
+            return False
+        if response.status_code not in [200, 204]:
+            logger.error(f"Failed to publish upcoming slots: {response.status_code} - {response.text}")
+            return False
+        logger.info(f"Published {len(entries)} upcoming slots, removed {len(expired)} "
+                    f"({raw_bytes} bytes, {wire_bytes} on the wire)")
+        return True
+    
     def cleanup_old_codes(self, keep_count: int = 100):
         """
         Remove old QR codes from Firebase, keeping only the most recent ones
         
+        Lists keys with a shallow read and deletes every stale entry in one
+        multi-path update, so cleanup costs two small requests.
+        
         Args:
             keep_count: Number of recent codes to keep
         """
         try:
-            # Get all QR codes
-            url = f"{self.database_url}/qr_codes.json"
-            headers = {}
-            if self.auth_token:
-                headers['Authorization'] = f'Bearer {self.auth_token}'
-            
-            response = requests.get(url, headers=headers)
+            # List keys only (values come back as true)
+            response = self.request('GET', "qr_codes.json", params={'shallow': 'true'})
             if response.status_code != 200:
-                logger.error(f"Failed to fetch QR codes: {response.status_code}")
+                logger.error(f"Failed to list QR codes: {response.status_code}")
                 return
             
-            qr_codes = response.json() or {}
+            keys = response.json() or {}
             
             # Sort by timestamp (filename format: YYYYMMDDHHMMSS)
-            sorted_codes = sorted(qr_codes.keys(), reverse=True)
+            sorted_codes = sorted(keys, reverse=True)
             
             # Delete old codes
             codes_to_delete = sorted_codes[keep_count:]
-            for code_id in codes_to_delete:
-                delete_url = f"{self.database_url}/qr_codes/{code_id}.json"
-                response = requests.delete(delete_url, headers=headers)
-                if response.status_code == 200:
-                    logger.info(f"Deleted old QR code: {code_id}")
-                else:
-                    logger.error(f"Failed to delete {code_id}: {response.status_code}")
+            if not codes_to_delete:
+                return
+            
+            update = {f"qr_codes/{code_id}": None for code_id in codes_to_delete}
+            response, _, _ = self.send_json('PATCH', ".json", update)
+            if response.status_code in [200, 204]:
+                logger.info(f"Deleted {len(codes_to_delete)} old QR codes")
+            else:
+                logger.error(f"Failed to delete old QR codes: {response.status_code}")
                     
         except Exception as e:
             logger.error(f"Error cleaning up old codes: {e}")
 
+def pattern_from_timestamp(timestamp: str) -> str:
+    """
+    Derive the Rise Gym pattern from a YYYYMMDDHHMMSS file timestamp
+    
+    Raises:
+        ValueError: If the timestamp is not in YYYYMMDDHHMMSS format
+    """
+    # Parse timestamp
+    dt = datetime.strptime(timestamp, "%Y%m%d%H%M%S")
+    
+    # Generate pattern: 9268 + MMDDYYYY + HHMMSS
+    pattern = "9268"
+    pattern += dt.strftime("%m%d%Y")
+    
+    # Determine time slot
+    hour = dt.hour
+    if hour % 2 == 0:
+        pattern += f"{hour:02d}00"
+        pattern += "00" if hour == 0 else "00"
+    else:
+        pattern += f"{hour-1:02d}00"
+        pattern += "01"
+    
+    return pattern
+
+def uploader_from_env(**kwargs) -> FirebaseUploader:
+    """
+    Build an uploader from FIREBASE_* environment variables
+    
+    Args:
+        **kwargs: Extra FirebaseUploader arguments
+        
+    Returns:
+        FirebaseUploader, or None if FIREBASE_DATABASE_URL is not set
+    """
+    database_url = os.environ.get('FIREBASE_DATABASE_URL')
+    if not database_url:
+        return None
+    
+    # Optional: Firebase auth token (for secured databases)
+    auth_token = os.environ.get('FIREBASE_AUTH_TOKEN')
+    
+    # Optional: "slim" history entries (metadata only) instead of full copies
+    history_mode = os.environ.get('FIREBASE_HISTORY_MODE', 'full')
+    
+    # The Android app renders svgContent/bitmapBase64, so both stay on unless
+    # every client reads the compact bits field
+    include_svg = os.environ.get('FIREBASE_INCLUDE_SVG', '1') != '0'
+    include_bitmap = os.environ.get('FIREBASE_INCLUDE_BITMAP', '1') != '0'
+    
+    # Optional: gzip copy of the SVG, and gzip request bodies (off by
+    # default - only for endpoints that accept Content-Encoding: gzip)
+    include_svg_gz = os.environ.get('FIREBASE_INCLUDE_SVG_GZ', '0') == '1'
+    compress_requests = os.environ.get('FIREBASE_GZIP_REQUESTS', '0') == '1'
+    
+    return FirebaseUploader(database_url, auth_token, history_mode=history_mode,
+                            include_svg=include_svg, include_bitmap=include_bitmap,
+                            include_svg_gz=include_svg_gz, compress_requests=compress_requests,
+                            **kwargs)
+
 def main():
     """Main function to upload QR code from GitHub Actions"""
     
     # Get Firebase configuration from environment
-    database_url = os.environ.get('FIREBASE_DATABASE_URL')
-    if not database_url:
+    uploader = uploader_from_env()
+    if not uploader:
         logger.error("FIREBASE_DATABASE_URL environment variable not set")
         sys.exit(1)
     
-    # Optional: Firebase auth token (for secured databases)
-    auth_token = os.environ.get('FIREBASE_AUTH_TOKEN')
+    export_from_env()
     
     # Get the latest QR code
     qr_dir = Path('real_qr_codes')
@@ -183,39 +639,32 @@ def main():
     
     # Generate pattern based on Rise Gym format
     try:
-        # Parse timestamp
-        dt = datetime.strptime(timestamp, "%Y%m%d%H%M%S")
-        
-        # Generate pattern: 9268 + MMDDYYYY + HHMMSS
-        pattern = "9268"
-        pattern += dt.strftime("%m%d%Y")
-        
-        # Determine time slot
-        hour = dt.hour
-        if hour % 2 == 0:
-            pattern += f"{hour:02d}00"
-            pattern += "00" if hour == 0 else "00"
-        else:
-            pattern += f"{hour-1:02d}00"
-            pattern += "01"
-            
+        pattern = pattern_from_timestamp(timestamp)
         logger.info(f"Generated pattern: {pattern}")
-        
-    except Exception as e:
+    except ValueError as e:
         logger.error(f"Error generating pattern: {e}")
         pattern = timestamp  # Fallback to timestamp
     
     # Upload to Firebase
-    uploader = FirebaseUploader(database_url, auth_token)
-    
-    if uploader.upload_qr_code(latest_svg, pattern):
-        logger.info("Successfully uploaded QR code to Firebase")
-        
-        # Cleanup old codes
-        uploader.cleanup_old_codes(keep_count=50)
-    else:
-        logger.error("Failed to upload QR code")
-        sys.exit(1)
+    try:
+        if uploader.upload_qr_code(latest_svg, pattern):
+            if uploader.last_skipped:
+                logger.info("Firebase already up to date")
+                return
+            
+            logger.info("Successfully uploaded QR code to Firebase")
+            
+            # Cleanup old codes; FIREBASE_KEEP_COUNT=0 keeps a backfilled history
+            keep_count = int(os.environ.get('FIREBASE_KEEP_COUNT') or DEFAULT_KEEP_COUNT)
+            if keep_count > 0:
+                uploader.cleanup_old_codes(keep_count=keep_count)
+            else:
+                logger.info("History cleanup disabled (FIREBASE_KEEP_COUNT=0)")
+        else:
+            logger.error("Failed to upload QR code")
+            sys.exit(1)
+    finally:
+        uploader.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Local Realtime Database Stand-in
+In-memory server for the Firebase RTDB REST subset the uploaders use
+
+Supports GET (with shallow, orderBy="$key", startAt/endAt and
+limitToFirst/limitToLast), PUT, PATCH (including multi-path updates at
+any level) and DELETE on /<path>.json, with optional latency injection
+and queued error responses (fail_next) for exercising client retries.
+Request bodies may be gzip-encoded (Content-Encoding: gzip).
+GET /.stats reports request counts and body bytes so upload throughput
+and cleanup cost can be measured offline; DELETE /.stats resets them.
+
+Point any script at it with FIREBASE_DATABASE_URL=http://127.0.0.1:9000
+"""
+
+import gzip
+import json
+import time
+import random
+import threading
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+DEFAULT_PORT = 9000
+
+
+class RTDBError(Exception):
+    """Request the real database would reject (sent as 400)"""
+
+
+def _clean(value):
+    """Drop nulls and empty objects the way the database does"""
+    if isinstance(value, dict):
+        cleaned = {str(k): _clean(v) for k, v in value.items()}
+        cleaned = {k: v for k, v in cleaned.items() if v is not None}
+        return cleaned or None
+    return value
+
+
+class LocalRTDB:
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, latency=0.0, jitter=0.0, data=None):
+        """
+        Initialize server
+
+        Args:
+            host: Interface to listen on
+            port: TCP port (0 picks a free one)
+            latency: Seconds added to every response
+            jitter: Extra random delay of up to this many seconds
+            data: Initial database contents
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.root = {'value': _clean(data)}
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.failures = deque()
+        self.server = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """Serve from a daemon thread
+
+        Returns:
+            self, so tests can write LocalRTDB(port=0).start()
+        """
+        handler = type('RTDBHandler', (_RTDBHandler,), {'db': self})
+        self.server = ThreadingHTTPServer((self.host, self.port), handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def fail_next(self, status=503, count=1, retry_after=None):
+        """Answer the next count requests with an error instead of serving them
+
+        Args:
+            status: HTTP status to send (e.g. 429 or 503)
+            count: Number of requests to fail
+            retry_after: Retry-After header value to send, if any
+        """
+        with self.lock:
+            self.failures.extend([(status, retry_after)] * count)
+
+    def get(self, parts):
+        """Value at a path, or None"""
+        node = self.root.get('value')
+        for part in parts:
+            if not isinstance(node, dict):
+                return None
+            node = node.get(part)
+        return node
+
+    def set(self, parts, value):
+        """Replace the value at a path (None deletes it)"""
+        keys = ['value'] + parts
+        trail = [self.root]
+        for key in keys[:-1]:
+            child = trail[-1].get(key)
+            if not isinstance(child, dict):
+                child = trail[-1][key] = {}
+            trail.append(child)
+
+        value = _clean(value)
+        if value is None:
+            trail[-1].pop(keys[-1], None)
+        else:
+            trail[-1][keys[-1]] = value
+
+        # Remove objects left empty, innermost first
+        for parent, key in reversed(list(zip(trail[:-1], keys[:-1]))):
+            if not parent[key]:
+                del parent[key]
+
+    def update(self, parts, values):
+        """Apply a (multi-path) update relative to a path"""
+        if not isinstance(values, dict):
+            raise RTDBError("Invalid data; couldn't parse JSON object")
+        paths = [[p for p in key.split('/') if p] for key in values]
+        for i, a in enumerate(paths):
+            for b in paths[i + 1:]:
+                shorter = min(len(a), len(b))
+                if a[:shorter] == b[:shorter]:
+                    raise RTDBError("Invalid data; path ancestor of another path in update")
+        for path, value in zip(paths, values.values()):
+            self.set(parts + path, value)
+
+    def query(self, value, params):
+        """Apply shallow / orderBy="$key" / range and limit parameters"""
+        if 'shallow' in params:
+            if params['shallow'] != 'true':
+                raise RTDBError("shallow must be true")
+            if any(name in params for name in ('orderBy', 'limitToFirst', 'limitToLast')):
+                raise RTDBError("Mixing 'shallow' and querying parameters is not supported")
+            return {k: True for k in value} if isinstance(value, dict) else value
+
+        if 'orderBy' not in params:
+            if any(name in params for name in ('limitToFirst', 'limitToLast', 'startAt', 'endAt')):
+                raise RTDBError("orderBy must be defined when other query parameters are defined")
+            return value
+
+        try:
+            order_by = json.loads(params['orderBy'])
+            start_at = json.loads(params['startAt']) if 'startAt' in params else None
+            end_at = json.loads(params['endAt']) if 'endAt' in params else None
+            first = int(params['limitToFirst']) if 'limitToFirst' in params else None
+            last = int(params['limitToLast']) if 'limitToLast' in params else None
+        except ValueError:
+            raise RTDBError("Invalid query parameter")
+        if order_by != '$key':
+            raise RTDBError("Only orderBy=\"$key\" is supported")
+        if first is not None and last is not None:
+            raise RTDBError("Only one of limitToFirst and limitToLast may be set")
+        if not isinstance(value, dict):
+            return value
+
+        keys = sorted(k for k in value
+                      if (start_at is None or k >= str(start_at)) and (end_at is None or k <= str(end_at)))
+        if first is not None:
+            keys = keys[:first]
+        if last is not None:
+            keys = keys[-last:] if last else []
+        return {k: value[k] for k in keys} or None
+
+    def handle(self, method, path, params, body):
+        """Execute one REST request
+
+        Returns:
+            (status, response value)
+        """
+        if not path.endswith('.json'):
+            return 404, {'error': 'Paths must end in .json'}
+        parts = [unquote(p) for p in path[:-len('.json')].split('/') if p]
+
+        try:
+            with self.lock:
+                if method == 'GET':
+                    return 200, self.query(self.get(parts), params)
+                if method == 'DELETE':
+                    self.set(parts, None)
+                    return 200, None
+
+                try:
+                    value = json.loads(body or b'null')
+                except ValueError:
+                    raise RTDBError("Invalid data; couldn't parse JSON object")
+                if method == 'PUT':
+                    self.set(parts, value)
+                    return 200, value
+                if method == 'PATCH':
+                    self.update(parts, value)
+                    return 200, value
+        except RTDBError as e:
+            return 400, {'error': str(e)}
+        return 405, {'error': f'{method} not supported'}
+
+    def snapshot_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+class _RTDBHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real endpoint
+    db = None
+
+    def respond(self, status, value, silent=False, retry_after=None, before_send=None):
+        body = b'' if silent else json.dumps(value).encode()
+        if before_send:
+            # Lets stats land before the client can see the reply
+            before_send(len(body))
+        self.send_response(204 if silent and status == 200 else status)
+        if retry_after is not None:
+            self.send_header('Retry-After', str(retry_after))
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return len(body)
+
+    def dispatch(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        wire = self.rfile.read(length) if length else b''
+        body = wire
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if url.path == '/.stats':
+            if self.command == 'DELETE':
+                with self.db.lock:
+                    self.db.stats.clear()
+            self.respond(200, self.db.snapshot_stats())
+            return
+
+        if self.db.latency or self.db.jitter:
+            time.sleep(self.db.latency + random.uniform(0, self.db.jitter))
+
+        with self.db.lock:
+            failure = self.db.failures.popleft() if self.db.failures else None
+
+        def record(sent):
+            with self.db.lock:
+                self.db.stats['requests'] += 1
+                self.db.stats[f'{self.command.lower()}_requests'] += 1
+                self.db.stats['bytes_in'] += len(wire)
+                self.db.stats['bytes_in_raw'] += len(body)
+                self.db.stats['bytes_out'] += sent
+                if status >= 400:
+                    self.db.stats['errors'] += 1
+
+        if failure:
+            status, retry_after = failure
+            self.respond(status, {'error': 'Injected failure'}, retry_after=retry_after, before_send=record)
+            return
+
+        status, value = 400, {'error': 'Invalid gzip body'}
+        try:
+            if self.headers.get('Content-Encoding', '').lower() == 'gzip':
+                body = gzip.decompress(wire)
+        except (OSError, EOFError):
+            pass
+        else:
+            status, value = self.db.handle(self.command, url.path, params, body)
+        self.respond(status, value, silent=params.get('print') == 'silent', before_send=record)
+
+    do_GET = do_PUT = do_PATCH = do_DELETE = do_POST = dispatch
+
+    def log_message(self, format, *args):
+        pass  # Benchmarks would otherwise be dominated by console output
+
+
+def main():
+    """Command line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local stand-in for the Firebase Realtime Database REST API')
+    parser.add_argument('--host', default='127.0.0.1',
+                       help='Interface to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                       help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--latency', type=float, default=0.0,
+                       help='Seconds added to every response (default: 0)')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                       help='Extra random delay of up to this many seconds (default: 0)')
+    parser.add_argument('--data', help='JSON file to load as the initial contents')
+
+    args = parser.parse_args()
+
+    data = None
+    if args.data:
+        with open(args.data, 'r') as f:
+            data = json.load(f)
+
+    db = LocalRTDB(args.host, args.port, args.latency, args.jitter, data).start()
+    print(f"🔥 Local RTDB on {db.url} (FIREBASE_DATABASE_URL={db.url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        db.stop()
+        print(f"\n📊 {db.snapshot_stats()}")
+
+if __name__ == "__main__":
+    main()
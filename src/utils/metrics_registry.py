@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Metrics Registry
+In-process counters and histograms exposed in Prometheus text format
+
+Long-running processes (the monitor) serve /metrics over HTTP when
+QR_METRICS_PORT is set; one-shot runs (scraper, uploader) write the same
+text to QR_METRICS_TEXTFILE on exit for the node_exporter textfile
+collector. Updates are a dict lookup and an add under a lock.
+"""
+
+import os
+import atexit
+import time
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _format_labels(labelnames, values, extra=None):
+    """Render {name="value",...} (empty string when there are no labels)"""
+    pairs = list(zip(labelnames, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    """Monotonic counter, optionally labelled"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {} if self.labelnames else {(): 0}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally labelled"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            series = {key: dict(s, counts=list(s['counts'])) for key, s in self._series.items()}
+        for key, s in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, s['counts']):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', bound))} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {s['count']}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {s['sum']}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {s['count']}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, documentation, **kwargs):
+        with self._lock:
+            if name not in self.metrics:
+                self.metrics[name] = cls(name, documentation, **kwargs)
+            return self.metrics[name]
+
+    def counter(self, name, documentation, labelnames=()):
+        """Get or create a counter"""
+        return self._register(Counter, name, documentation, labelnames=labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Get or create a histogram"""
+        return self._register(Histogram, name, documentation, labelnames=labelnames, buckets=buckets)
+
+    def render(self):
+        """All metrics in Prometheus text exposition format"""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+SCRAPES = REGISTRY.counter('qr_scrapes_total', 'Scrape attempts', ['source'])
+SCRAPE_FAILURES = REGISTRY.counter('qr_scrape_failures_total', 'Scrape attempts that returned no QR code', ['source'])
+SCRAPE_BYTES = REGISTRY.counter('qr_scrape_bytes_total', 'Bytes transferred by the browser while scraping', ['source'])
+CHANGES = REGISTRY.counter('qr_changes_total', 'QR code changes detected', ['source'])
+UPLOADS = REGISTRY.counter('qr_uploads_total', 'Firebase upload attempts')
+UPLOAD_FAILURES = REGISTRY.counter('qr_upload_failures_total', 'Firebase uploads that failed')
+UPLOAD_SKIPS = REGISTRY.counter('qr_upload_skips_total', 'Uploads skipped because /latest already held the content')
+UPLOAD_BYTES = REGISTRY.counter('qr_upload_bytes_total', 'Request body bytes sent to Firebase, counted on every attempt including retries')
+UPLOAD_RAW_BYTES = REGISTRY.counter('qr_upload_raw_bytes_total', 'Request body bytes before compression, counted once per request (retries excluded)')
+
+SCRAPE_SECONDS = REGISTRY.histogram('qr_scrape_seconds', 'Scrape attempt duration', ['source'])
+DECODE_SECONDS = REGISTRY.histogram('qr_decode_seconds', 'SVG to module matrix/payload decode duration',
+                                    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+UPLOAD_SECONDS = REGISTRY.histogram('qr_upload_seconds', 'Firebase upload duration')
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep scrapes of /metrics out of the console
+
+
+def start_http_server(port, host='127.0.0.1', registry=REGISTRY):
+    """Serve /metrics from a daemon thread
+
+    Returns:
+        The running ThreadingHTTPServer
+    """
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def write_textfile(path, registry=REGISTRY):
+    """Write metrics atomically for the node_exporter textfile collector"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+def export_from_env(port=None):
+    """Expose metrics as configured by QR_METRICS_PORT / QR_METRICS_TEXTFILE
+
+    Args:
+        port: Port to serve on, overriding QR_METRICS_PORT
+    """
+    port = port or os.getenv('QR_METRICS_PORT')
+    if port:
+        host = os.getenv('QR_METRICS_HOST', '127.0.0.1')
+        start_http_server(int(port), host)
+        print(f"📈 Metrics on http://{host}:{port}/metrics")
+
+    textfile = os.getenv('QR_METRICS_TEXTFILE')
+    if textfile:
+        atexit.register(write_textfile, textfile)
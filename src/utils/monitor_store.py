@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Monitor Event Store
+Append-only event log with periodic compaction into a state snapshot
+
+Every sample is appended as one JSON line; fsyncs are batched. The
+compactor folds the log into the snapshot and truncates it, so state is
+rebuilt on startup from the snapshot plus whatever the log holds past
+the snapshot's sequence number. Change events are kept in the snapshot
+as a queryable history.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+from pathlib import Path
+
+# Add repository root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.data.qr_database import write_json_atomic
+
+# Event fields copied into state so the baseline can be verified on startup
+BASELINE_FIELDS = ['last_file', 'last_size', 'last_mtime_ns', 'last_matrix_size', 'last_fingerprint']
+
+
+def empty_state():
+    """State before any sample has been recorded"""
+    return {
+        'seq': 0,
+        'last_hash': None,
+        'change_count': 0,
+        'total_samples': 0,
+        'last_update': None,
+        'changes': []
+    }
+
+
+def apply_event(state, event):
+    """Fold one event into state (in place) and return it"""
+    state['seq'] = event['seq']
+    state['last_update'] = event['timestamp']
+
+    if event['status'] == 'BASELINE':
+        state['last_hash'] = event.get('hash')
+        state['total_samples'] = event.get('total_samples', state['total_samples'])
+        state.update({k: event[k] for k in BASELINE_FIELDS if k in event})
+        return state
+
+    if event['status'] == 'FAILED':
+        return state
+
+    state['total_samples'] += 1
+    if event['status'] == 'DIFFERENT':
+        state['change_count'] += 1
+        state['changes'].append({
+            'timestamp': event['timestamp'],
+            'sample': event.get('sample'),
+            'hash': event.get('hash'),
+            'previous_hash': state.get('last_hash')
+        })
+    state['last_hash'] = event.get('hash')
+    state.update({k: event[k] for k in BASELINE_FIELDS if k in event})
+    return state
+
+
+class MonitorEventLog:
+    def __init__(self, log_path='qr_monitor_events.jsonl', snapshot_path='qr_monitor_state.json',
+                 fsync_every=10, fsync_interval=60.0, compact_every=200, read_only=False):
+        """
+        Open the event store
+
+        Args:
+            log_path: Append-only JSONL event log
+            snapshot_path: Compacted state snapshot
+            fsync_every: Fsync after this many unsynced events
+            fsync_interval: Fsync when the oldest unsynced event is this many seconds old
+            compact_every: Fold the log into the snapshot after this many events
+            read_only: Only load state; never repair, append to or compact the files
+        """
+        self.log_path = Path(log_path)
+        self.snapshot_path = Path(snapshot_path)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.read_only = read_only
+
+        self.state = empty_state()
+        self._log = None
+        self._unsynced = 0
+        self._first_unsynced_at = None
+        self._since_compaction = 0
+
+    def load(self):
+        """Rebuild state from the snapshot plus the log tail
+
+        Returns:
+            State dict (see empty_state)
+        """
+        state = empty_state()
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, 'r') as f:
+                state.update(json.load(f))
+
+        if self.log_path.exists():
+            good_end = 0
+            with open(self.log_path, 'rb') as f:
+                for line in f:
+                    end = good_end + len(line)
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        if end < os.fstat(f.fileno()).st_size:
+                            good_end = end
+                            continue  # Corrupt line mid-log: skip only it
+                        break  # Torn write at the end of the log
+                    if not line.endswith(b'\n'):
+                        break  # Complete event whose newline never made it
+                    good_end = end
+                    if event.get('seq', 0) > state['seq']:
+                        apply_event(state, event)
+                        self._since_compaction += 1
+
+            # Cut a torn tail off before anything is appended after it,
+            # otherwise the next event lands on the broken line
+            if not self.read_only and good_end < self.log_path.stat().st_size:
+                with open(self.log_path, 'r+b') as f:
+                    f.truncate(good_end)
+                    os.fsync(f.fileno())
+
+        self.state = state
+        return state
+
+    def append(self, event):
+        """Append an event; fsyncs and compaction happen in batches
+
+        Returns:
+            The event with its sequence number
+        """
+        if self.read_only:
+            raise OSError(f"Event log {self.log_path} is open read-only")
+        event = dict(event, seq=self.state['seq'] + 1)
+        if self._log is None:
+            self._log = open(self.log_path, 'a')
+
+        self._log.write(json.dumps(event) + '\n')
+        self._log.flush()
+        apply_event(self.state, event)
+
+        self._unsynced += 1
+        self._since_compaction += 1
+        if self._first_unsynced_at is None:
+            self._first_unsynced_at = time.monotonic()
+        if (self._unsynced >= self.fsync_every or
+                time.monotonic() - self._first_unsynced_at >= self.fsync_interval):
+            self.sync()
+
+        if self._since_compaction >= self.compact_every:
+            self.compact()
+
+        return event
+
+    def sync(self):
+        """Fsync pending log writes"""
+        if self._log and self._unsynced:
+            os.fsync(self._log.fileno())
+        self._unsynced = 0
+        self._first_unsynced_at = None
+
+    def compact(self):
+        """Write state to the snapshot, then truncate the log"""
+        self.sync()
+        write_json_atomic(self.snapshot_path, self.state)
+
+        # Events up to state['seq'] are now in the snapshot; a crash before
+        # the truncate only leaves events that load() will skip by seq
+        if self._log:
+            self._log.close()
+            self._log = None
+        with open(self.log_path, 'w') as f:
+            os.fsync(f.fileno())
+        self._since_compaction = 0
+
+    def changes(self):
+        """Recorded QR changes, oldest first"""
+        return list(self.state['changes'])
+
+    def close(self):
+        """Flush and close the log"""
+        try:
+            self.sync()
+        except OSError as e:
+            logging.error(f"Could not sync monitor event log: {e}")
+        if self._log:
+            self._log.close()
+            self._log = None
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+QR Change Notification Hub
+Pushes new-code events to local subscribers over Server-Sent Events
+
+Subscribers connect to GET /events and receive one "qr" event per new
+code, carrying payload, slot, hash and a compact SVG. Late subscribers
+replay the bounded buffer (or everything after their Last-Event-ID).
+The monitor publishes in process; the scraper POSTs to /publish at
+QR_NOTIFY_URL. /publish requires "Authorization: Bearer $QR_NOTIFY_TOKEN"
+when that variable is set and is loopback-only otherwise, so a hub bound
+to 0.0.0.0 cannot be fed fake codes from the LAN.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import hmac
+import hashlib
+import ipaddress
+import urllib.request
+from collections import deque
+from datetime import datetime
+
+# Add repository root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.qr_matrix import parse_svg_matrix, decode_matrix, matrix_to_svg
+from src.utils.scrape_scheduler import SLOT_PREFIX_LENGTH
+
+DEFAULT_PORT = 8765
+MAX_PUBLISH_BYTES = 64 * 1024
+KEEPALIVE_SECONDS = 15
+
+
+def build_event(svg_content, source):
+    """Build a new-code event from scraped SVG markup"""
+    matrix = parse_svg_matrix(svg_content)
+    payload = decode_matrix(matrix) if matrix else None
+    return {
+        'type': 'new_code',
+        'source': source,
+        'timestamp': datetime.now().isoformat(),
+        'hash': hashlib.md5(svg_content.encode()).hexdigest(),
+        'payload': payload,
+        'slot': payload[:SLOT_PREFIX_LENGTH] if payload else None,
+        'svg': matrix_to_svg(matrix) if matrix else None
+    }
+
+
+def is_valid_event(event):
+    """Check a published body looks like a build_event() event"""
+    if not isinstance(event, dict) or event.get('type') != 'new_code':
+        return False
+    if not isinstance(event.get('hash'), str):
+        return False
+    return all(event.get(key) is None or isinstance(event[key], str)
+               for key in ('source', 'timestamp', 'payload', 'slot', 'svg'))
+
+
+def is_loopback(host):
+    """Whether a peer address is this machine (IPv4-mapped IPv6 included)"""
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    mapped = getattr(address, 'ipv4_mapped', None)
+    return (mapped or address).is_loopback
+
+
+def post_event(url, event, timeout=2, token=None):
+    """POST an event to a hub's /publish endpoint
+
+    Notification is best-effort: any failure is logged, never raised.
+
+    Args:
+        token: Shared publish token (default: QR_NOTIFY_TOKEN)
+
+    Returns:
+        True if the hub accepted the event
+    """
+    token = token or os.getenv('QR_NOTIFY_TOKEN')
+    try:
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        request = urllib.request.Request(
+            url, data=json.dumps(event).encode(), headers=headers, method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status == 202
+    except Exception as e:
+        print(f"⚠️  Could not notify {url}: {type(e).__name__}: {e}")
+        return False
+
+
+class NotificationHub:
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, replay_size=50, token=None):
+        """
+        Initialize hub
+
+        Args:
+            host: Interface to listen on (use 0.0.0.0 to reach phones on the LAN)
+            port: TCP port
+            replay_size: Events kept for late subscribers
+            token: Shared token /publish requires (default: QR_NOTIFY_TOKEN;
+                without one only loopback clients may publish)
+        """
+        self.host = host
+        self.port = port
+        self.token = token or os.getenv('QR_NOTIFY_TOKEN')
+        self.replay = deque(maxlen=replay_size)
+        self.subscribers = set()
+        self.handlers = set()
+        self.next_id = 1
+        self.loop = None
+        self.server = None
+
+    async def start(self):
+        """Start listening on the running loop"""
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        print(f"📡 Notification hub on http://{self.host}:{self.port}/events")
+
+    async def stop(self):
+        """Stop listening and end open streams"""
+        if self.server:
+            self.server.close()
+        for queue in list(self.subscribers):
+            self.end_stream(queue)
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        if self.server:
+            await self.server.wait_closed()
+
+    def end_stream(self, queue):
+        """Make a subscriber's stream finish after what it has queued"""
+        self.subscribers.discard(queue)
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def publish(self, event):
+        """Assign an id, buffer the event and fan it out (loop thread only)"""
+        event = dict(event, id=self.next_id)
+        self.next_id += 1
+        self.replay.append(event)
+
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Subscriber is not keeping up - end its stream so it
+                # reconnects and replays from its Last-Event-ID
+                self.end_stream(queue)
+        return event
+
+    def publish_threadsafe(self, event):
+        """Publish from a worker thread (e.g. a monitor sample)"""
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.publish, event)
+
+    async def handle(self, reader, writer):
+        """Serve one HTTP request"""
+        task = asyncio.current_task()
+        self.handlers.add(task)
+        try:
+            request_line = await reader.readline()
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            path = target.split('?', 1)[0]
+            if method == 'GET' and path == '/events':
+                await self.stream(writer, headers.get('last-event-id'))
+            elif method == 'POST' and path == '/publish':
+                if not self.may_publish(writer, headers):
+                    await self.respond(writer, '403 Forbidden')
+                    return
+                length = int(headers.get('content-length', 0))
+                if length > MAX_PUBLISH_BYTES:
+                    await self.respond(writer, '413 Payload Too Large')
+                    return
+                event = json.loads(await reader.readexactly(length))
+                if not is_valid_event(event):
+                    await self.respond(writer, '400 Bad Request')
+                    return
+                self.publish(event)
+                await self.respond(writer, '202 Accepted')
+            else:
+                await self.respond(writer, '404 Not Found')
+        except (ValueError, asyncio.IncompleteReadError):
+            await self.respond(writer, '400 Bad Request')
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            self.handlers.discard(task)
+
+    def may_publish(self, writer, headers):
+        """Check a /publish request carries the token, or comes from loopback"""
+        if self.token:
+            expected = f'Bearer {self.token}'
+            return hmac.compare_digest(headers.get('authorization', '').encode(), expected.encode())
+        peer = writer.get_extra_info('peername')
+        return bool(peer) and is_loopback(peer[0])
+
+    async def respond(self, writer, status):
+        """Send an empty response"""
+        try:
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def stream(self, writer, last_event_id=None):
+        """Replay buffered events, then push new ones until the client leaves"""
+        writer.write(b"HTTP/1.1 200 OK\r\n"
+                     b"Content-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\n"
+                     b"Connection: keep-alive\r\n"
+                     b"Access-Control-Allow-Origin: *\r\n\r\n")
+
+        after = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+        for event in self.replay:
+            if event['id'] > after:
+                writer.write(self.format_event(event))
+        await writer.drain()
+
+        queue = asyncio.Queue(maxsize=self.replay.maxlen)
+        self.subscribers.add(queue)
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    writer.write(b": keepalive\n\n")
+                else:
+                    if event is None:
+                        return
+                    writer.write(self.format_event(event))
+                await writer.drain()
+        finally:
+            self.subscribers.discard(queue)
+
+    def format_event(self, event):
+        """Encode an event in SSE wire format"""
+        return f"id: {event['id']}\nevent: qr\ndata: {json.dumps(event)}\n\n".encode()
+
+
+async def serve(host, port, replay_size):
+    """Run a standalone hub until interrupted (token from QR_NOTIFY_TOKEN)"""
+    hub = NotificationHub(host, port, replay_size)
+    await hub.start()
+    await asyncio.Event().wait()
+
+
+def main():
+    """Command line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='QR change notification hub (Server-Sent Events)')
+    parser.add_argument('--host', default='127.0.0.1',
+                       help='Interface to listen on (default: 127.0.0.1, use 0.0.0.0 for LAN; '
+                            'set QR_NOTIFY_TOKEN so remote publishers can authenticate)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                       help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--replay', type=int, default=50,
+                       help='Events replayed to late subscribers (default: 50)')
+
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.replay))
+    except KeyboardInterrupt:
+        print("\n🛑 Notification hub stopped")
+
+if __name__ == "__main__":
+    main()
@@ -5,10 +5,11 @@ Monitors for QR code changes over time with automatic PNG conversion
 """
 
 import os
-import time
+import sys
+import asyncio
 import hashlib
-import schedule
 import logging
+import threading
 from datetime import datetime
 from pathlib import Path
 from selenium import webdriver
@@ -16,22 +17,56 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException
 from dotenv import load_dotenv
 import subprocess
 
+# Optional: lets the monitor recycle a Chrome that has grown too large
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+# Add repository root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.qr_matrix import (
+    parse_svg_matrix, decode_matrix, diff_matrices, pack_matrix, unpack_matrix
+)
+from src.data.qr_database import DATA_DIR, DATABASE_FILE, add_file
+from src.utils.metrics_registry import CHANGES, DECODE_SECONDS, export_from_env
+from src.utils.monitor_store import MonitorEventLog
+from src.utils.notify_hub import NotificationHub, build_event, post_event
+from src.utils.rasterizers import RasterizerRegistry
+from src.utils.scrape_metrics import ScrapeMetrics, TRANSFER_SIZE_JS
+from src.utils.scrape_scheduler import seconds_until_next_sample
+
 class QRHourlyMonitor:
-    def __init__(self):
+    def __init__(self, name=None, username=None, password=None,
+                 svg_dir="real_qr_codes", png_dir="qr_monitor_png", read_only=False):
         # Load environment
         load_dotenv()
-        self.username = os.getenv('USERNAME')
-        self.password = os.getenv('PASSWORD')
+        self.name = name
+        # Status queries only read state and never write to the event log
+        self.read_only = read_only
+        self.username = username or os.getenv('USERNAME')
+        self.password = password or os.getenv('PASSWORD')
         self.login_url = "https://risegyms.ez-runner.com/login.aspx"
         
+        # Named targets keep their own state files next to the default ones
+        suffix = f"_{name}" if name else ""
+        self.status_file = f"qr_monitor_status{suffix}.txt"
+        # Every target names its samples by minute, so targets need their
+        # own database or the second one's sample looks already present
+        self.database_file = DATA_DIR / f"qr_code_database{suffix}.json" if name else DATABASE_FILE
+        
         # Setup directories
-        self.svg_dir = Path("real_qr_codes")
-        self.png_dir = Path("qr_monitor_png") 
-        self.svg_dir.mkdir(exist_ok=True)
-        self.png_dir.mkdir(exist_ok=True)
+        self.svg_dir = Path(svg_dir)
+        self.png_dir = Path(png_dir)
+        if not read_only:
+            self.svg_dir.mkdir(parents=True, exist_ok=True)
+            self.png_dir.mkdir(parents=True, exist_ok=True)
         
         # Setup logging (silent - only errors to file)
         logging.basicConfig(
@@ -42,83 +77,153 @@ class QRHourlyMonitor:
         
         # Track last known hash and comparison
         self.last_hash = None
-        self.last_svg_content = None
+        self.last_file = None
+        self.last_matrix = None
         self.change_count = 0
         self.total_samples = 0
         
+        # Probe PNG converters once instead of on every sample
+        self.rasterizers = RasterizerRegistry()
+        
+        # Per-phase timings for the sample in progress
+        self.metrics = ScrapeMetrics(self.metrics_source, rss_probe=self.driver_rss_mb)
+        
+        # Warm browser session reused across samples
+        self.driver = None
+        self.driver_samples = 0
+        self.max_samples_per_driver = int(os.getenv('QR_MONITOR_DRIVER_SAMPLES', '24'))
+        self.max_driver_rss_mb = int(os.getenv('QR_MONITOR_DRIVER_RSS_MB', '1024'))
+        
+        # New-code events go to a hub in this process (set by MonitorScheduler)
+        # or to a standalone hub at QR_NOTIFY_URL
+        notify_url = os.getenv('QR_NOTIFY_URL')
+        self.publish = (lambda event: post_event(notify_url, event)) if notify_url else None
+        
+        # Append-only sample log, compacted into qr_monitor_state.json
+        self.event_log = MonitorEventLog(
+            log_path=f"qr_monitor_events{suffix}.jsonl",
+            snapshot_path=f"qr_monitor_state{suffix}.json",
+            read_only=read_only
+        )
+        
         # Load previous state if available
         self.load_previous_state()
     
+    @property
+    def metrics_source(self):
+        """Metrics source name, tagged with the target name if set"""
+        return f"monitor:{self.name}" if self.name else 'monitor'
+    
     def load_previous_state(self):
-        """Load previous monitoring state from file"""
+        """Rebuild monitoring state from the snapshot plus event log tail"""
         try:
-            import json
-            state_file = Path('qr_monitor_state.json')
+            state = self.event_log.load()
             
-            # If state file exists, load it
-            if state_file.exists():
-                with open(state_file, 'r') as f:
-                    state = json.load(f)
-                
+            if state['last_hash'] or state['total_samples']:
                 self.last_hash = state.get('last_hash')
                 self.change_count = state.get('change_count', 0)
                 self.total_samples = state.get('total_samples', 0)
+                
+                if self.restore_latest(state):
+                    return
+                
+                # State points at a missing or modified file - rescan
+                self.recover_latest()
             else:
-                # No state file - check if we have existing SVG files
-                svg_files = list(self.svg_dir.glob('*.svg'))
-                if svg_files:
-                    # Initialize state from existing files
-                    self.total_samples = len(svg_files)
-                    latest_svg = max(svg_files, key=lambda p: p.stat().st_mtime)
-                    
-                    # Load the most recent SVG to use as comparison baseline
-                    try:
-                        with open(latest_svg, 'r') as f:
-                            self.last_svg_content = f.read()
-                            self.last_hash = hashlib.md5(self.last_svg_content.encode()).hexdigest()
-                    except:
-                        pass
-            
-            # Always try to load the latest SVG content if we have a hash
-            if self.last_hash:
-                svg_files = list(self.svg_dir.glob('*.svg'))
-                if svg_files:
-                    latest_svg = max(svg_files, key=lambda p: p.stat().st_mtime)
-                    try:
-                        with open(latest_svg, 'r') as f:
-                            content = f.read()
-                            content_hash = hashlib.md5(content.encode()).hexdigest()
-                            if content_hash == self.last_hash:
-                                self.last_svg_content = content
-                    except:
-                        pass
+                # No state yet - initialize state from existing files
+                self.total_samples = self.recover_latest()
+                if not self.read_only:
+                    self.record_sample('BASELINE', total_samples=self.total_samples)
                         
-        except Exception:
-            pass  # Start fresh if state loading fails
+        except Exception as e:
+            logging.error(f"Could not load monitor state, starting fresh: {e}")
     
-    def save_state(self):
-        """Save current monitoring state to file"""
+    def restore_latest(self, state):
+        """Restore the comparison baseline from state if the file is unchanged"""
+        last_file = state.get('last_file')
+        fingerprint = state.get('last_fingerprint')
+        if not last_file or not fingerprint:
+            return False
+        
         try:
-            import json
-            state = {
-                'last_hash': self.last_hash,
-                'change_count': self.change_count,
-                'total_samples': self.total_samples,
-                'last_update': datetime.now().isoformat()
-            }
-            
-            with open('qr_monitor_state.json', 'w') as f:
-                json.dump(state, f, indent=2)
-        except Exception:
-            pass  # Fail silently
+            stat = os.stat(last_file)
+        except OSError:
+            return False
+        
+        if stat.st_size != state.get('last_size') or stat.st_mtime_ns != state.get('last_mtime_ns'):
+            return False
+        
+        self.last_file = last_file
+        self.last_matrix = unpack_matrix(bytes.fromhex(fingerprint), state.get('last_matrix_size', 21))
+        return True
     
-    def update_database(self):
-        """Update the QR code database after saving a new file"""
+    def recover_latest(self):
+        """Scan the SVG directory once for the newest file and use it as baseline
+        
+        Returns:
+            Number of SVG files found
+        """
+        latest = None
+        latest_mtime = None
+        count = 0
+        with os.scandir(self.svg_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.svg') or not entry.is_file():
+                    continue
+                count += 1
+                mtime = entry.stat().st_mtime_ns
+                if latest_mtime is None or mtime > latest_mtime:
+                    latest, latest_mtime = entry.path, mtime
+        
+        if latest:
+            try:
+                with open(latest, 'r') as f:
+                    content = f.read()
+                content_hash = hashlib.md5(content.encode()).hexdigest()
+                
+                # Only trust the file as baseline if it matches the saved hash
+                if self.last_hash is None or content_hash == self.last_hash:
+                    self.last_hash = content_hash
+                    self.last_file = latest
+                    self.last_matrix = parse_svg_matrix(content)
+            except OSError as e:
+                logging.error(f"Could not read latest SVG {latest}: {e}")
+        
+        return count
+    
+    def record_sample(self, status, **fields):
+        """Append a sample event to the monitor event log"""
+        if self.read_only:
+            return
+        
+        event = {
+            'timestamp': datetime.now().isoformat(),
+            'status': status,
+            'hash': self.last_hash
+        }
+        event.update(fields)
+        
+        try:
+            # Enough to verify the baseline on startup with a single stat
+            if status != 'FAILED' and self.last_file and self.last_matrix:
+                stat = os.stat(self.last_file)
+                event.update({
+                    'last_file': str(self.last_file),
+                    'last_size': stat.st_size,
+                    'last_mtime_ns': stat.st_mtime_ns,
+                    'last_matrix_size': len(self.last_matrix),
+                    'last_fingerprint': pack_matrix(self.last_matrix).hex()
+                })
+            
+            self.event_log.append(event)
+        except OSError as e:
+            logging.error(f"Could not record {status} sample: {e}")
+    
+    def update_database(self, svg_path):
+        """Add a newly saved file to the QR code database"""
         try:
-            result = subprocess.run(['python', 'qr_database.py'], 
-                                  capture_output=True, text=True, cwd='.')
-            if result.returncode != 0:
-                logging.error(f"Database update failed: {result.stderr}")
+            if not add_file(svg_path, self.database_file):
+                logging.error(f"Database update skipped: {svg_path} is not a timestamped file")
         except Exception as e:
             logging.error(f"Could not update database: {e}")
         
@@ -148,12 +253,14 @@ class QRHourlyMonitor:
     def login_silently(self, driver):
         """Login to Rise Gym (silent failure)"""
         try:
+            self.metrics.begin('navigation')
             driver.get(self.login_url)
             wait = WebDriverWait(driver, 15)
             
             # Wait for page load and form
             wait.until(EC.presence_of_element_located((By.TAG_NAME, "form")))
-            time.sleep(2)  # Extra wait for form to be ready
+            
+            self.metrics.begin('login')
             
             # Find email input using multiple strategies
             email_input = None
@@ -207,12 +314,18 @@ class QRHourlyMonitor:
             password_input.clear()
             password_input.send_keys(self.password)
             
+            # Count login page traffic before we navigate away
+            self.metrics.add_bytes(driver.execute_script(f"return ({TRANSFER_SIZE_JS})();"))
+            
             # Submit form using JavaScript (most reliable)
-            time.sleep(1)
             driver.execute_script("document.forms[0].submit();")
             
             # Wait for navigation away from login page
-            time.sleep(5)
+            self.metrics.begin('dashboard_wait')
+            try:
+                wait.until(lambda d: "login" not in d.current_url.lower())
+            except:
+                return False
             
             # Check if login was successful by looking for QR or welcome message
             try:
@@ -226,9 +339,73 @@ class QRHourlyMonitor:
             logging.error(f"Login failed: {e}")
             return False
     
+    def driver_rss_mb(self):
+        """Resident memory of the Chrome process tree in MB (None if unknown)"""
+        if not HAS_PSUTIL or not self.driver:
+            return None
+        try:
+            root = psutil.Process(self.driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+        except Exception:
+            return None
+    
+    def close(self):
+        """Quit the browser and flush the event log"""
+        self.close_driver()
+        self.event_log.close()
+    
+    def close_driver(self):
+        """Quit the warm browser session"""
+        if self.driver:
+            try:
+                self.driver.quit()
+            except:
+                pass
+        self.driver = None
+        self.driver_samples = 0
+    
+    def get_session_driver(self):
+        """Return a logged-in driver, reusing the warm session when healthy"""
+        if self.driver:
+            rss = self.driver_rss_mb()
+            if self.driver_samples >= self.max_samples_per_driver or (rss and rss > self.max_driver_rss_mb):
+                self.close_driver()
+        
+        if self.driver:
+            try:
+                # A refresh is enough while the session cookie is alive
+                self.metrics.begin('navigation')
+                self.driver.refresh()
+                if "login" not in self.driver.current_url.lower():
+                    return self.driver
+                
+                # Session expired - we were redirected to the login page
+                if self.login_silently(self.driver):
+                    return self.driver
+            except WebDriverException as e:
+                logging.error(f"Warm session unusable, restarting browser: {e}")
+            self.close_driver()
+        
+        self.metrics.begin('browser_launch')
+        driver = self.setup_headless_driver()
+        if not driver:
+            return None
+        
+        if not self.login_silently(driver):
+            try:
+                driver.quit()
+            except:
+                pass
+            return None
+        
+        self.driver = driver
+        return driver
+    
     def extract_qr_svg(self, driver, timestamp):
         """Extract QR SVG content and save"""
         try:
+            self.metrics.begin('extraction')
             wait = WebDriverWait(driver, 10)
             
             # Wait for SVG elements to be present (the QR code)
@@ -247,13 +424,18 @@ class QRHourlyMonitor:
             if not svg_content or len(svg_content) < 1000:
                 return None
             
+            self.metrics.add_bytes(driver.execute_script(f"return ({TRANSFER_SIZE_JS})();"))
+            
             # Create hash for comparison
             svg_hash = hashlib.md5(svg_content.encode()).hexdigest()
             
             # Compare with previous QR
-            comparison_result = self.compare_with_previous(svg_content, svg_hash)
+            with DECODE_SECONDS.time():
+                svg_matrix = parse_svg_matrix(svg_content)
+            comparison_result = self.compare_with_previous(svg_matrix, svg_hash)
             
             # Save SVG file
+            self.metrics.begin('save')
             svg_filename = f"{timestamp}.svg"
             svg_path = self.svg_dir / svg_filename
             
@@ -261,18 +443,25 @@ class QRHourlyMonitor:
                 f.write(svg_content)
             
             # Convert to PNG
-            png_success = self.convert_svg_to_png(svg_path, timestamp)
+            with self.metrics.phase('png_conversion'):
+                png_success = self.convert_svg_to_png(svg_path, timestamp)
             
             # Update tracking
             self.last_hash = svg_hash
-            self.last_svg_content = svg_content
+            self.last_file = str(svg_path)
+            self.last_matrix = svg_matrix
             self.total_samples += 1
             
-            # Save state for persistence
-            self.save_state()
-            
             # Update database
-            self.update_database()
+            with self.metrics.phase('database_update'):
+                self.update_database(svg_path)
+            
+            if self.publish and comparison_result['status'] in ('FIRST', 'DIFFERENT'):
+                # Best-effort: the sample is already saved and recorded
+                try:
+                    self.publish(build_event(svg_content, self.metrics_source))
+                except Exception as e:
+                    logging.error(f"Could not publish change notification: {e}")
             
             return {
                 'timestamp': timestamp,
@@ -287,7 +476,7 @@ class QRHourlyMonitor:
             logging.error(f"QR extraction failed: {e}")
             return None
     
-    def compare_with_previous(self, current_svg, current_hash):
+    def compare_with_previous(self, current_matrix, current_hash):
         """Compare current QR with previous QR and return comparison result"""
         if self.last_hash is None:
             # First sample
@@ -307,10 +496,11 @@ class QRHourlyMonitor:
         else:
             # Different QR
             self.change_count += 1
+            CHANGES.inc(source=self.metrics_source)
             logging.error(f"QR CHANGE DETECTED! Count: {self.change_count}, New Hash: {current_hash}, Previous: {self.last_hash}")
             
             # Try to identify what changed
-            differences = self.analyze_differences(current_svg, self.last_svg_content)
+            differences = self.analyze_differences(current_matrix, self.last_matrix)
             
             return {
                 'status': 'DIFFERENT',
@@ -322,91 +512,45 @@ class QRHourlyMonitor:
                 'previous_hash': self.last_hash
             }
     
-    def analyze_differences(self, current_svg, previous_svg):
-        """Analyze what differences exist between two SVG contents"""
-        if not previous_svg:
-            return "No previous SVG to compare"
+    def analyze_differences(self, current_matrix, previous_matrix):
+        """Analyze which QR modules and payload digits changed between two samples"""
+        if not previous_matrix:
+            return ["No previous QR code to compare"]
         
-        differences = []
+        summary = diff_matrices(previous_matrix, current_matrix)
+        if summary is None:
+            return ["Could not compare module grids"]
         
-        # Length comparison
-        if len(current_svg) != len(previous_svg):
-            differences.append(f"Length changed: {len(previous_svg)} → {len(current_svg)}")
+        differences = [f"Modules flipped: {summary['total']}"]
+        if summary['function']:
+            differences.append(f"Function patterns: {summary['function']}")
+        if summary['format']:
+            differences.append(f"Format info: {summary['format']}")
+        if summary['data']:
+            codewords = ' '.join(str(i) for i in summary['data_codewords'])
+            differences.append(f"Data codewords: {summary['data']} modules (codewords {codewords})")
+        if summary['ec']:
+            differences.append(f"EC codewords: {summary['ec']} modules")
         
-        # Simple character-level differences
-        if current_svg != previous_svg:
-            # Count differing positions
-            diff_count = sum(1 for a, b in zip(current_svg, previous_svg) if a != b)
-            if len(current_svg) != len(previous_svg):
-                diff_count += abs(len(current_svg) - len(previous_svg))
-            
-            differences.append(f"Character differences: {diff_count}")
-            
-            # Try to find specific patterns that changed
-            import re
-            current_rects = re.findall(r'<rect[^>]+>', current_svg)
-            previous_rects = re.findall(r'<rect[^>]+>', previous_svg)
-            
-            if len(current_rects) != len(previous_rects):
-                differences.append(f"Rectangle count changed: {len(previous_rects)} → {len(current_rects)}")
-            
-        return differences if differences else ["Content differs but specific changes unclear"]
+        # Show which payload digits changed
+        previous_payload = decode_matrix(previous_matrix)
+        current_payload = decode_matrix(current_matrix)
+        if previous_payload and current_payload:
+            changed = [str(i) for i, (a, b) in enumerate(zip(previous_payload, current_payload)) if a != b]
+            if len(previous_payload) != len(current_payload):
+                changed.append("length")
+            differences.append(f"Payload: {previous_payload} → {current_payload} (positions {' '.join(changed) or 'none'})")
+        
+        return differences
     
     def convert_svg_to_png(self, svg_path, timestamp):
-        """Convert SVG to PNG using available tools"""
+        """Convert SVG to PNG with the fastest available rasterizer"""
         try:
             png_filename = f"{timestamp}.png"
             png_path = self.png_dir / png_filename
             
-            # Try cairosvg first (if available)
-            try:
-                import cairosvg
-                cairosvg.svg2png(url=str(svg_path), write_to=str(png_path), output_width=580, output_height=580)
+            if self.rasterizers.convert(svg_path, png_path, size=580):
                 return True
-            except (ImportError, Exception):
-                pass
-            
-            # Try rsvg-convert (usually available on macOS with brew)
-            try:
-                result = subprocess.run([
-                    'rsvg-convert',
-                    '-w', '580', '-h', '580',
-                    '-o', str(png_path),
-                    str(svg_path)
-                ], capture_output=True, timeout=30, check=False)
-                if result.returncode == 0 and png_path.exists():
-                    return True
-            except (subprocess.TimeoutExpired, FileNotFoundError):
-                pass
-            
-            # Try convert (ImageMagick)
-            try:
-                result = subprocess.run([
-                    'convert',
-                    '-background', 'white',
-                    '-density', '200',
-                    str(svg_path),
-                    str(png_path)
-                ], capture_output=True, timeout=30, check=False)
-                if result.returncode == 0 and png_path.exists():
-                    return True
-            except (subprocess.TimeoutExpired, FileNotFoundError):
-                pass
-            
-            # Try inkscape
-            try:
-                result = subprocess.run([
-                    'inkscape', 
-                    '--export-type=png',
-                    '--export-filename', str(png_path),
-                    '--export-width', '580',
-                    '--export-height', '580',
-                    str(svg_path)
-                ], capture_output=True, timeout=30, check=False)
-                if result.returncode == 0 and png_path.exists():
-                    return True
-            except (subprocess.TimeoutExpired, FileNotFoundError):
-                pass
             
             # Simple fallback - just copy SVG as text reference
             try:
@@ -427,25 +571,23 @@ class QRHourlyMonitor:
     def collect_qr_sample(self):
         """Collect a single QR sample (main scheduled function)"""
         timestamp = self.get_current_timestamp()
-        driver = None
+        result = None
+        self.metrics = ScrapeMetrics(self.metrics_source, rss_probe=self.driver_rss_mb)
         
         try:
-            # Setup driver
-            driver = self.setup_headless_driver()
+            # Reuse the warm session (logs in again only if needed)
+            driver = self.get_session_driver()
             if not driver:
                 return
             
-            # Login
-            if not self.login_silently(driver):
-                return
-            
             # Extract QR
             result = self.extract_qr_svg(driver, timestamp)
+            self.driver_samples += 1
             
             if result:
                 # Display comparison result prominently
                 comparison = result['comparison']
-                print(f"\n🔍 COMPARISON RESULT:")
+                print(f"\n🔍 COMPARISON RESULT{f' ({self.name})' if self.name else ''}:")
                 print(f"   {comparison['message']}")
                 
                 if comparison['status'] == 'DIFFERENT':
@@ -468,7 +610,7 @@ class QRHourlyMonitor:
                     'last_comparison': comparison['status']
                 }
                 
-                with open('qr_monitor_status.txt', 'w') as f:
+                with open(self.status_file, 'w') as f:
                     f.write(f"Last: {timestamp}\n")
                     f.write(f"Samples: {self.total_samples}\n")
                     f.write(f"Changes: {self.change_count}\n")
@@ -477,105 +619,34 @@ class QRHourlyMonitor:
             
         except Exception as e:
             logging.error(f"Collection failed: {e}")
+            self.close_driver()
         finally:
-            if driver:
-                try:
-                    driver.quit()
-                except:
-                    pass
+            record = self.metrics.finish(result is not None, timestamp=timestamp)
+            status = result['comparison']['status'] if result else 'FAILED'
+            self.record_sample(status, sample=timestamp, durations=record['phases'])
     
     def start_interactive_monitoring(self):
         """Start interactive command-based monitoring"""
-        print("🕐 QR Interactive Monitor")
-        print(f"📁 SVG files: {self.svg_dir}")
-        print(f"📁 PNG files: {self.png_dir}")
-        print("🔕 Fails silently - check qr_monitor.log for errors")
-        print("📊 Status: qr_monitor_status.txt")
-        print("\n💡 Commands:")
-        print("  'c' or 'collect' - Collect QR sample now")
-        print("  's' or 'status'  - Show current status")
-        print("  'q' or 'quit'    - Exit monitor")
-        print("  'h' or 'help'    - Show this help")
-        print("\n✅ Ready for commands (press Enter after each command):\n")
-        
-        try:
-            while True:
-                try:
-                    command = input("QR Monitor> ").strip().lower()
-                    
-                    if command in ['c', 'collect']:
-                        print("📊 Collecting QR sample...")
-                        self.collect_qr_sample()
-                        print(f"✅ Sample collected. Total: {self.total_samples}, Changes: {self.change_count}")
-                        
-                    elif command in ['s', 'status']:
-                        self.quick_status()
-                        
-                    elif command in ['q', 'quit', 'exit']:
-                        break
-                        
-                    elif command in ['h', 'help']:
-                        print("\n💡 Commands:")
-                        print("  'c' or 'collect' - Collect QR sample now")
-                        print("  's' or 'status'  - Show current status")
-                        print("  'q' or 'quit'    - Exit monitor")
-                        print("  'h' or 'help'    - Show this help")
-                        print()
-                        
-                    elif command == '':
-                        continue  # Empty input, just prompt again
-                        
-                    else:
-                        print(f"❓ Unknown command: '{command}'. Type 'h' for help.")
-                        
-                except EOFError:
-                    break
-                except KeyboardInterrupt:
-                    break
-                    
-        except KeyboardInterrupt:
-            pass
-            
-        print(f"\n🛑 Monitor stopped")
-        print(f"📊 Total samples collected: {len(list(self.svg_dir.glob('*.svg')))}")
-        print(f"🔄 Changes detected: {self.change_count}")
+        MonitorScheduler([self]).start()
     
-    def start_auto_monitoring(self):
-        """Start automatic hourly monitoring (original behavior)"""
-        print("🕐 QR Auto Monitor Started")
-        print(f"📁 SVG files: {self.svg_dir}")
-        print(f"📁 PNG files: {self.png_dir}")
-        print("⏰ Collecting every hour at :00 minutes")
-        print("🔕 Running silently - check qr_monitor.log for errors")
-        print("📊 Status: qr_monitor_status.txt")
-        print("\n✅ Press Ctrl+C to stop\n")
-        
-        # Schedule hourly collection at the top of each hour
-        schedule.every().hour.at(":00").do(self.collect_qr_sample)
-        
-        # Also collect one sample now for immediate feedback
-        print(f"📊 Collecting initial sample...")
-        self.collect_qr_sample()
-        
-        initial_samples = len(list(self.svg_dir.glob('*.svg')))
-        print(f"✅ Initial sample collected. Total samples: {initial_samples}")
-        
-        # Run scheduler
-        try:
-            while True:
-                schedule.run_pending()
-                time.sleep(30)  # Check every 30 seconds
-        except KeyboardInterrupt:
-            print(f"\n🛑 Monitoring stopped")
-            print(f"📊 Total samples collected: {len(list(self.svg_dir.glob('*.svg')))}")
-            print(f"🔄 Changes detected: {self.change_count}")
+    def start_auto_monitoring(self, interval=3600, offset=0):
+        """Start automatic monitoring, sampling on slot-aligned times"""
+        MonitorScheduler([self], interval=interval, offset=offset,
+                         interactive=sys.stdin.isatty()).start()
+    
+    def show_history(self):
+        """Print every recorded QR change"""
+        changes = self.event_log.changes()
+        print(f"🔄 {len(changes)} recorded change(s):")
+        for change in changes:
+            print(f"   {change['timestamp']}  {change['previous_hash']} → {change['hash']}")
     
     def quick_status(self):
         """Show current monitoring status"""
         svg_count = len(list(self.svg_dir.glob('*.svg')))
         png_count = len(list(self.png_dir.glob('*.png')))
         
-        print(f"📊 QR Monitor Status:")
+        print(f"📊 QR Monitor Status{f' ({self.name})' if self.name else ''}:")
         print(f"   Total samples: {self.total_samples}")
         print(f"   SVG files: {svg_count}")
         print(f"   PNG files: {png_count}")
@@ -595,6 +666,193 @@ class QRHourlyMonitor:
         else:
             print(f"   Status: Ready for comparison")
 
+class MonitorScheduler:
+    def __init__(self, monitors, interval=None, offset=0, interactive=True, hub=None):
+        """
+        Run one or more monitors on a single asyncio loop
+        
+        Args:
+            monitors: QRHourlyMonitor instances, one per target
+            interval: Seconds between scheduled samples on a grid aligned to
+                gym-local midnight, so samples land on slot boundaries
+                (None = only sample on command)
+            offset: Seconds after each grid point to sample at
+            interactive: Read commands from stdin alongside sampling
+            hub: NotificationHub to serve on this loop and publish new codes to
+        """
+        self.monitors = monitors
+        self.interval = interval
+        self.offset = offset
+        self.interactive = interactive
+        self.hub = hub
+        self.locks = {}
+    
+    async def sample(self, monitor):
+        """Collect one sample in a worker thread, one at a time per target"""
+        async with self.locks[id(monitor)]:
+            await asyncio.to_thread(monitor.collect_qr_sample)
+    
+    async def sample_all(self):
+        """Collect a sample from every target in parallel"""
+        await asyncio.gather(*(self.sample(monitor) for monitor in self.monitors))
+    
+    async def run_schedule(self, monitor):
+        """Sleep until each planned sample time, then sample"""
+        while True:
+            await asyncio.sleep(seconds_until_next_sample(self.interval, self.offset))
+            await self.sample(monitor)
+    
+    def read_stdin(self, loop, queue):
+        """Forward stdin lines to the loop (None on EOF)
+        
+        Runs in a daemon thread so a pending input() never blocks exit.
+        """
+        while True:
+            try:
+                line = input()
+            except EOFError:
+                line = None
+            loop.call_soon_threadsafe(queue.put_nowait, line)
+            if line is None:
+                return
+    
+    def print_help(self):
+        """Print interactive commands"""
+        print("\n💡 Commands:")
+        print("  'c' or 'collect' - Collect QR sample now")
+        print("  's' or 'status'  - Show current status")
+        print("  'q' or 'quit'    - Exit monitor")
+        print("  'h' or 'help'    - Show this help")
+        print()
+    
+    async def read_commands(self):
+        """Handle interactive commands until quit or EOF"""
+        queue = asyncio.Queue()
+        threading.Thread(target=self.read_stdin, args=(asyncio.get_running_loop(), queue),
+                         daemon=True).start()
+        
+        while True:
+            print("QR Monitor> ", end='', flush=True)
+            line = await queue.get()
+            if line is None:
+                return
+            command = line.strip().lower()
+            
+            if command in ['c', 'collect']:
+                print("📊 Collecting QR sample...")
+                await self.sample_all()
+                for monitor in self.monitors:
+                    print(f"✅ Sample collected. Total: {monitor.total_samples}, Changes: {monitor.change_count}")
+                    
+            elif command in ['s', 'status']:
+                for monitor in self.monitors:
+                    monitor.quick_status()
+                    
+            elif command in ['q', 'quit', 'exit']:
+                return
+                
+            elif command in ['h', 'help']:
+                self.print_help()
+                
+            elif command == '':
+                continue  # Empty input, just prompt again
+                
+            else:
+                print(f"❓ Unknown command: '{command}'. Type 'h' for help.")
+    
+    async def run(self):
+        """Sample on schedule and/or serve commands until stopped"""
+        self.locks = {id(monitor): asyncio.Lock() for monitor in self.monitors}
+        tasks = []
+        
+        if self.hub:
+            await self.hub.start()
+            for monitor in self.monitors:
+                monitor.publish = self.hub.publish_threadsafe
+        
+        if self.interval:
+            # Collect one sample now for immediate feedback
+            print(f"📊 Collecting initial sample...")
+            await self.sample_all()
+            print(f"✅ Initial sample collected. Total samples: {sum(m.total_samples for m in self.monitors)}")
+            
+            tasks = [asyncio.create_task(self.run_schedule(monitor)) for monitor in self.monitors]
+        
+        try:
+            if self.interactive:
+                await self.read_commands()
+            else:
+                await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.hub:
+                await self.hub.stop()
+    
+    def start(self):
+        """Run the loop, then close every monitor"""
+        mode = "Auto" if self.interval else "Interactive"
+        print(f"🕐 QR {mode} Monitor Started")
+        for monitor in self.monitors:
+            print(f"📁 {monitor.name or 'SVG'} files: {monitor.svg_dir}")
+        if self.interval:
+            print(f"⏰ Collecting every {self.interval // 60} minutes, aligned to slot boundaries (+{self.offset}s)")
+        print("🔕 Fails silently - check qr_monitor.log for errors")
+        print(f"📊 Status: {', '.join(monitor.status_file for monitor in self.monitors)}")
+        if self.interactive:
+            self.print_help()
+            print("✅ Ready for commands (press Enter after each command):\n")
+        else:
+            print("\n✅ Press Ctrl+C to stop\n")
+        
+        try:
+            asyncio.run(self.run())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for monitor in self.monitors:
+                monitor.close()
+        
+        print(f"\n🛑 Monitor stopped")
+        for monitor in self.monitors:
+            print(f"📊 Total samples collected: {len(list(monitor.svg_dir.glob('*.svg')))}")
+            print(f"🔄 Changes detected: {monitor.change_count}")
+
+def option(name, default=None):
+    """Value following a --name flag on the command line"""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return default
+
+def build_hub():
+    """Notification hub from --notify-port/--notify-host, if requested"""
+    port = option('--notify-port')
+    if not port:
+        return None
+    return NotificationHub(host=option('--notify-host', '127.0.0.1'), port=int(port))
+
+def build_monitors():
+    """One monitor per account in --targets, or the default account"""
+    targets = option('--targets')
+    if not targets:
+        return [QRHourlyMonitor()]
+    
+    from src.utils.async_qr_scraper import load_accounts
+    accounts, _ = load_accounts(targets)
+    return [
+        QRHourlyMonitor(
+            name=account['name'],
+            username=account['email'],
+            password=account['password'],
+            svg_dir=Path("real_qr_codes") / account['name'],
+            png_dir=Path("qr_monitor_png") / account['name']
+        )
+        for account in accounts
+    ]
+
 def install_dependencies():
     """Try to install cairosvg for better PNG conversion"""
     try:
@@ -612,38 +870,54 @@ def install_dependencies():
                 print("⚠️  cairosvg install failed - will use system tools")
 
 if __name__ == "__main__":
-    import sys
-    
     if len(sys.argv) > 1 and sys.argv[1] == "--status":
-        monitor = QRHourlyMonitor()
+        monitor = QRHourlyMonitor(read_only=True)
         monitor.quick_status()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--history":
+        monitor = QRHourlyMonitor(read_only=True)
+        monitor.show_history()
     elif len(sys.argv) > 1 and sys.argv[1] == "--install":
         install_dependencies()
     elif len(sys.argv) > 1 and sys.argv[1] == "--auto":
         print("🔬 QR Auto Monitor")
-        print("Automated QR code collection every hour")
+        print("Automated QR code collection on slot-aligned times")
         print("=" * 50)
         
         # Try to install dependencies
         install_dependencies()
+        export_from_env(option('--metrics-port'))
         
         # Start automatic monitoring
-        monitor = QRHourlyMonitor()
-        monitor.start_auto_monitoring()
+        MonitorScheduler(
+            build_monitors(),
+            interval=int(option('--interval', '60')) * 60,
+            offset=int(option('--offset', '0')),
+            interactive=sys.stdin.isatty(),
+            hub=build_hub()
+        ).start()
     elif len(sys.argv) > 1 and sys.argv[1] == "--collect":
         # Single collection
         print("📊 Single QR Collection")
         print("=" * 30)
         monitor = QRHourlyMonitor()
         monitor.collect_qr_sample()
+        monitor.close()
         monitor.quick_status()
     elif len(sys.argv) > 1 and sys.argv[1] == "--help":
         print("🔬 QR Monitor - Usage")
         print("=" * 30)
         print("python qr_hourly_monitor.py                # Interactive mode")
         print("python qr_hourly_monitor.py --auto         # Auto hourly collection")
+        print("    --interval MIN   # Minutes between samples (default: 60)")
+        print("    --offset SEC     # Seconds after each slot-aligned time (default: 0)")
+        print("    --targets FILE   # Accounts JSON, one monitor per account")
+        print("    --notify-port N  # Push new codes over SSE at http://HOST:N/events")
+        print("    --notify-host H  # Interface for the SSE hub (default: 127.0.0.1)")
+        print("                     # Set QR_NOTIFY_TOKEN to let other hosts publish")
+        print("    --metrics-port N # Serve Prometheus metrics at http://127.0.0.1:N/metrics")
         print("python qr_hourly_monitor.py --collect      # Single collection")
         print("python qr_hourly_monitor.py --status       # Show status")
+        print("python qr_hourly_monitor.py --history      # Show recorded changes")
         print("python qr_hourly_monitor.py --install      # Install dependencies")
         print("python qr_hourly_monitor.py --help         # Show this help")
         print()
@@ -652,6 +926,7 @@ if __name__ == "__main__":
         print("   qr_monitor_png/     # PNG files")
         print("   qr_monitor.log      # Error log")
         print("   qr_monitor_status.txt # Current status")
+        print("   qr_monitor_events.jsonl # Sample event log")
     else:
         print("🔬 QR Interactive Monitor")
         print("Manual QR code collection on command")
@@ -659,7 +934,7 @@ if __name__ == "__main__":
         
         # Try to install dependencies
         install_dependencies()
+        export_from_env(option('--metrics-port'))
         
         # Start interactive monitoring (default mode)
-        monitor = QRHourlyMonitor()
-        monitor.start_interactive_monitoring()
\ No newline at end of file
+        MonitorScheduler(build_monitors(), hub=build_hub()).start()
\ No newline at end of file
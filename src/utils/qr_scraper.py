@@ -5,10 +5,17 @@ Uses Playwright with proper form handling
 """
 
 import os
-import subprocess
+import sys
 from datetime import datetime
 from dotenv import load_dotenv
 
+# Add repository root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.data.qr_database import add_file
+from src.utils.metrics_registry import export_from_env
+from src.utils.scrape_metrics import ScrapeMetrics, TRANSFER_SIZE_JS
+
 try:
     from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
     PLAYWRIGHT_AVAILABLE = True
@@ -17,6 +24,78 @@ except ImportError:
     print("❌ Playwright not installed. Install with: pip install playwright && python -m playwright install")
     exit(1)
 
+# Login form selectors, tried in order
+EMAIL_SELECTORS = [
+    'input[type="email"]',
+    'input[placeholder*="Email" i]',
+    'input[name*="email" i]',
+    'input:first-of-type'
+]
+
+PASSWORD_SELECTORS = [
+    'input[type="password"]',
+    'input[placeholder*="Password" i]',
+    'input[name*="password" i]'
+]
+
+LOGIN_BUTTON_SELECTORS = [
+    '*:has-text("Log in"):not(:has(*))',  # Any element with exact text "Log in"
+    'a:has-text("Log in")',  # Link styled as button
+    'input[type="button"][value="Log in"]',  # Input button
+    'input[type="submit"][value="Log in"]',
+    'div:has-text("Log in"):not(:has(div))',  # Div button
+    'span:has-text("Log in")',  # Span button
+    'button:has-text("Log in")',  
+    'button:has-text("Log In")',
+    'input[type="submit"][value*="Login" i]',
+    'input[type="submit"][value*="Log" i]',
+    '#LoginButton',
+    'button[type="submit"]',
+    'input[type="submit"]'
+]
+
+# Either URL change or SVG presence means we made it past the login page
+DASHBOARD_READY_JS = '''() => {
+    return window.location.href.includes('BookingPortal') || 
+           window.location.href.includes('booking') ||
+           window.location.href.includes('dashboard') ||
+           document.querySelector('svg') !== null ||
+           document.querySelector('img[src*="QR" i]') !== null;
+}'''
+
+# QR codes have many small rectangles (200+), logos have few
+QR_RENDERED_JS = '''() => {
+    for (const svg of document.querySelectorAll('svg')) {
+        if (svg.querySelectorAll('rect').length > 200) {
+            return true;
+        }
+    }
+    return false;
+}'''
+
+# Scores every SVG on the page in one evaluate call and returns only the QR
+# code (the SVG with the most rectangles, 200+), so extraction costs a single
+# round-trip no matter how many icons the page renders.
+SELECT_QR_SVG_JS = '''() => {
+    const rectCounts = [];
+    let best = null;
+    let bestRects = 0;
+    for (const svg of document.querySelectorAll('svg')) {
+        const count = svg.querySelectorAll('rect').length;
+        rectCounts.push(count);
+        // QR codes have 200+ rectangles, logos typically have < 50
+        if (count > 200 && count > bestRects) {
+            best = svg;
+            bestRects = count;
+        }
+    }
+    return {
+        rectCounts: rectCounts,
+        rects: bestRects,
+        html: best ? best.outerHTML : null
+    };
+}'''
+
 class RiseGymQRScraperFinal:
     def __init__(self):
         load_dotenv()
@@ -59,6 +138,19 @@ class RiseGymQRScraperFinal:
     
     def _scrape_attempt(self, headless=True):
         """Single scrape attempt"""
+        metrics = ScrapeMetrics('scraper')
+        filename = None
+        try:
+            filename = self._browser_attempt(metrics, headless)
+            return filename
+        finally:
+            # Recorded only once sync_playwright() has exited and the driver
+            # and browser have been reaped, so their peak RSS is counted
+            metrics.finish(filename is not None)
+    
+    def _browser_attempt(self, metrics, headless=True):
+        """Drive the browser through one scrape, timing phases into metrics"""
+        metrics.begin('browser_launch')
         with sync_playwright() as p:
             browser = None
             try:
@@ -82,6 +174,7 @@ class RiseGymQRScraperFinal:
                 page = context.new_page()
                 
                 # Navigate to login page
+                metrics.begin('navigation')
                 print("📱 Navigating to Rise Gym login...")
                 page.goto(self.login_url, wait_until='networkidle')
                 
@@ -92,6 +185,7 @@ class RiseGymQRScraperFinal:
                 if not headless:
                     page.screenshot(path="debug_login_page.png")
                 
+                metrics.begin('login')
                 print("🔍 Finding login form elements...")
                 
                 # In CI, list all input fields for debugging
@@ -126,7 +220,7 @@ class RiseGymQRScraperFinal:
                 # Find and fill email field
                 # Try multiple selectors
                 email_filled = False
-                for selector in ['input[type="email"]', 'input[placeholder*="Email" i]', 'input[name*="email" i]', 'input:first-of-type']:
+                for selector in EMAIL_SELECTORS:
                     try:
                         page.wait_for_selector(selector, timeout=2000)
                         page.fill(selector, self.username)
@@ -141,7 +235,7 @@ class RiseGymQRScraperFinal:
                 
                 # Find and fill password field
                 password_filled = False
-                for selector in ['input[type="password"]', 'input[placeholder*="Password" i]', 'input[name*="password" i]']:
+                for selector in PASSWORD_SELECTORS:
                     try:
                         page.wait_for_selector(selector, timeout=2000)
                         page.fill(selector, self.password)
@@ -172,29 +266,16 @@ class RiseGymQRScraperFinal:
                     print(f"🔑 Password has spaces: {' ' in self.password}")
                     print(f"🔑 Password has special chars: {any(c in self.password for c in '!@#$%^&*()_+-=[]{}|;:,.<>?')}")
                 
+                # Count login page traffic before we navigate away
+                metrics.add_bytes(page.evaluate(TRANSFER_SIZE_JS))
+                
                 print("🚪 Submitting login form...")
                 
                 # Try multiple ways to submit the form
                 submit_success = False
                 
                 # Method 1: Look for specific login button
-                login_selectors = [
-                    '*:has-text("Log in"):not(:has(*))',  # Any element with exact text "Log in"
-                    'a:has-text("Log in")',  # Link styled as button
-                    'input[type="button"][value="Log in"]',  # Input button
-                    'input[type="submit"][value="Log in"]',
-                    'div:has-text("Log in"):not(:has(div))',  # Div button
-                    'span:has-text("Log in")',  # Span button
-                    'button:has-text("Log in")',  
-                    'button:has-text("Log In")',
-                    'input[type="submit"][value*="Login" i]',
-                    'input[type="submit"][value*="Log" i]',
-                    '#LoginButton',
-                    'button[type="submit"]',
-                    'input[type="submit"]'
-                ]
-                
-                for selector in login_selectors:
+                for selector in LOGIN_BUTTON_SELECTORS:
                     try:
                         if page.query_selector(selector):
                             page.click(selector)
@@ -239,6 +320,7 @@ class RiseGymQRScraperFinal:
                         page.evaluate('document.forms[0].submit()')
                         print("✅ Submitted via JavaScript")
                 
+                metrics.begin('dashboard_wait')
                 print("⏳ Waiting for dashboard to load...")
                 
                 # First wait for any navigation
@@ -250,16 +332,7 @@ class RiseGymQRScraperFinal:
                 # Wait for navigation with multiple conditions
                 try:
                     # Wait for either URL change or SVG presence
-                    page.wait_for_function(
-                        '''() => {
-                            return window.location.href.includes('BookingPortal') || 
-                                   window.location.href.includes('booking') ||
-                                   window.location.href.includes('dashboard') ||
-                                   document.querySelector('svg') !== null ||
-                                   document.querySelector('img[src*="QR" i]') !== null;
-                        }''',
-                        timeout=15000
-                    )
+                    page.wait_for_function(DASHBOARD_READY_JS, timeout=15000)
                 except PlaywrightTimeout:
                     print("⚠️  Timeout waiting for dashboard, checking current state...")
                 
@@ -300,6 +373,7 @@ class RiseGymQRScraperFinal:
                             pass
                 
                 # Look for QR code
+                metrics.begin('extraction')
                 print("🔍 Looking for QR code...")
                 
                 # Take a debug screenshot
@@ -307,70 +381,45 @@ class RiseGymQRScraperFinal:
                     page.screenshot(path="debug_page_loaded.png")
                 
                 # Try to find SVG elements
-                svg_elements = page.query_selector_all('svg')
+                svg_count = page.locator('svg').count()
                 
-                if not svg_elements:
+                if not svg_count:
                     # Wait a bit more and try again
                     page.wait_for_timeout(3000)
-                    svg_elements = page.query_selector_all('svg')
+                    svg_count = page.locator('svg').count()
                     
                 # Also check for img elements that might contain QR codes
                 img_elements = page.query_selector_all('img[src*="QR"], img[src*="qr"], img[alt*="QR"], img[alt*="qr"]')
                 if img_elements:
                     print(f"📷 Found {len(img_elements)} QR image elements")
                 
-                if svg_elements:
-                    print(f"✅ Found {len(svg_elements)} SVG elements")
+                if svg_count:
+                    print(f"✅ Found {svg_count} SVG elements")
                     
                     # Wait for QR code SVG to have proper dimensions (21x21 grid = 441+ rectangles for version 1)
                     # or at least 200+ rectangles for a valid QR code
                     print("⏳ Waiting for QR code to fully render...")
                     try:
-                        page.wait_for_function(
-                            '''() => {
-                                const svgs = document.querySelectorAll('svg');
-                                for (const svg of svgs) {
-                                    const rects = svg.querySelectorAll('rect');
-                                    // QR codes have many small rectangles, logos have few
-                                    if (rects.length > 200) {
-                                        return true;
-                                    }
-                                }
-                                return false;
-                            }''',
-                            timeout=10000
-                        )
+                        page.wait_for_function(QR_RENDERED_JS, timeout=10000)
                     except PlaywrightTimeout:
                         print("⚠️  Timeout waiting for QR code to render fully")
                     
-                    # Find the QR code SVG specifically (has many rectangles)
-                    qr_svg = None
-                    max_rectangles = 0
+                    # Score every SVG and pick the QR code in a single round-trip
+                    selection = page.evaluate(SELECT_QR_SVG_JS)
+                    for i, rect_count in enumerate(selection['rectCounts']):
+                        print(f"   SVG {i+1}: {rect_count} rectangles")
                     
-                    for i, svg in enumerate(svg_elements):
-                        try:
-                            # Count rectangles directly in browser for accuracy
-                            rect_count = svg.evaluate('(element) => element.querySelectorAll("rect").length')
-                            html = svg.evaluate('(element) => element.outerHTML')
-                            
-                            print(f"   SVG {i+1}: {len(html)} characters, {rect_count} rectangles")
-                            
-                            # QR codes have 200+ rectangles, logos typically have < 50
-                            if rect_count > 200 and rect_count > max_rectangles:
-                                max_rectangles = rect_count
-                                qr_svg = html
-                                
-                            # Debug preview
-                            if len(html) < 1000:
-                                preview = html[:200].replace('\n', ' ')
-                                print(f"   Preview: {preview}...")
-                        except:
-                            continue
+                    qr_svg = selection['html']
+                    max_rectangles = selection['rects']
                     
                     if qr_svg:
+                        metrics.add_bytes(page.evaluate(TRANSFER_SIZE_JS))
+                        
                         # Save QR code
+                        metrics.begin('save')
                         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
                         filename = f"real_qr_codes/{timestamp}.svg"
+                        previous_svg = self.latest_saved_svg()
                         
                         with open(filename, 'w') as f:
                             f.write(qr_svg)
@@ -380,7 +429,12 @@ class RiseGymQRScraperFinal:
                         print(f"📊 Rectangles: {max_rectangles}")
                         
                         # Update database
-                        self.update_database()
+                        with metrics.phase('database_update'):
+                            self.update_database(filename)
+                        
+                        # Subscribers only want an event when the code changes
+                        if qr_svg != previous_svg:
+                            self.notify(qr_svg)
                         
                         browser.close()
                         return filename
@@ -423,34 +477,77 @@ class RiseGymQRScraperFinal:
             except Exception as e:
                 print(f"⚠️  Could not save debug screenshot: {e}")
     
-    def update_database(self):
-        """Update the QR code database"""
+    def latest_saved_svg(self):
+        """Content of the newest saved QR code, or None if there is none"""
         try:
-            result = subprocess.run(['python', 'qr_database.py'], 
-                                  capture_output=True, text=True, cwd='.')
-            if result.returncode == 0:
+            with os.scandir("real_qr_codes") as entries:
+                names = [entry.name for entry in entries if entry.name.endswith('.svg')]
+            if not names:
+                return None
+            # Names are timestamps, so the newest sorts last
+            with open(os.path.join("real_qr_codes", max(names)), 'r') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def notify(self, svg_content):
+        """Push a new-code event to the hub at QR_NOTIFY_URL, if set"""
+        notify_url = os.getenv('QR_NOTIFY_URL')
+        if not notify_url:
+            return
+        
+        # Best-effort: the code is already saved, so never fail the scrape here
+        try:
+            from src.utils.notify_hub import build_event, post_event
+            if post_event(notify_url, build_event(svg_content, 'scraper')):
+                print(f"📡 Notified {notify_url}")
+        except Exception as e:
+            print(f"⚠️  Could not notify {notify_url}: {e}")
+    
+    def update_database(self, svg_path):
+        """Add the new QR code to the database"""
+        try:
+            if add_file(svg_path):
                 print("📊 Database updated successfully")
             else:
-                print(f"⚠️  Database update warning: {result.stderr}")
+                print(f"⚠️  Database update skipped: {svg_path} is not a timestamped file")
         except Exception as e:
             print(f"⚠️  Could not update database: {e}")
 
 def main():
     """Main function"""
     import argparse
-    import sys
     
     parser = argparse.ArgumentParser(description='Rise Gym QR Scraper (Final)')
     parser.add_argument('--debug', action='store_true', 
                        help='Run in debug mode (visible browser)')
     parser.add_argument('--retries', type=int, default=3,
                        help='Number of retry attempts (default: 3)')
+    parser.add_argument('--predictive', action='store_true',
+                       help='Skip the browser when the stored QR code matches the predicted slot')
+    parser.add_argument('--burst-interval', type=int, default=60,
+                       help='Seconds between scrapes while waiting for a rollover (default: 60)')
+    parser.add_argument('--burst-window', type=int, default=600,
+                       help='Seconds after a rollover to keep scraping for the new code (default: 600)')
     
     args = parser.parse_args()
+    export_from_env()
     
     try:
         scraper = RiseGymQRScraperFinal()
-        result = scraper.scrape_qr_code(headless=not args.debug, max_retries=args.retries)
+        
+        if args.predictive:
+            from src.utils.scrape_scheduler import PredictiveScrapeScheduler
+            scheduler = PredictiveScrapeScheduler(
+                burst_interval=args.burst_interval,
+                burst_window=args.burst_window
+            )
+            status, result = scheduler.run(scraper, headless=not args.debug, max_retries=args.retries)
+            if status == 'skipped':
+                print("\n✅ QR code already up to date")
+                return True
+        else:
+            result = scraper.scrape_qr_code(headless=not args.debug, max_retries=args.retries)
         
         if result:
             print(f"\n✅ Success! QR code scraped: {result}")
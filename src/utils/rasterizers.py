@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+SVG Rasterizer Registry
+Probes SVG-to-PNG backends once and remembers the fastest one that works
+
+Backends are ordered fastest first: the native module-matrix renderer
+(no external process), cairosvg, then the rsvg-convert, ImageMagick and
+Inkscape command line tools.
+"""
+
+import os
+import sys
+import shutil
+import logging
+import subprocess
+from abc import ABC, abstractmethod
+
+# Add repository root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.qr_matrix import parse_svg_matrix, matrix_to_png
+
+QUIET_ZONE = 4
+
+
+class Rasterizer(ABC):
+    """Base class for an SVG to PNG backend"""
+    name = 'base'
+
+    def available(self):
+        """Check once whether this backend can run on this machine"""
+        return True
+
+    @abstractmethod
+    def convert(self, svg_path, png_path, size):
+        """Rasterize svg_path into png_path; return True on success"""
+
+
+class NativeRasterizer(Rasterizer):
+    """Render the QR module matrix directly, in process"""
+    name = 'native'
+
+    def convert(self, svg_path, png_path, size):
+        with open(svg_path, 'r') as f:
+            matrix = parse_svg_matrix(f.read())
+        if not matrix:
+            return False
+
+        scale = max(1, size // (len(matrix) + 2 * QUIET_ZONE))
+        with open(png_path, 'wb') as f:
+            f.write(matrix_to_png(matrix, scale=scale, border=QUIET_ZONE))
+        return True
+
+
+class CairoRasterizer(Rasterizer):
+    """Render with cairosvg, in process"""
+    name = 'cairosvg'
+
+    def available(self):
+        try:
+            import cairosvg  # noqa: F401
+            return True
+        except (ImportError, OSError):
+            return False
+
+    def convert(self, svg_path, png_path, size):
+        import cairosvg
+        cairosvg.svg2png(url=str(svg_path), write_to=str(png_path), output_width=size, output_height=size)
+        return True
+
+
+class CommandRasterizer(Rasterizer):
+    """Render with an external command line tool"""
+
+    def __init__(self, name, build_command):
+        self.name = name
+        self.build_command = build_command
+
+    def available(self):
+        return shutil.which(self.name) is not None
+
+    def convert(self, svg_path, png_path, size):
+        result = subprocess.run(self.build_command(str(svg_path), str(png_path), size),
+                                capture_output=True, timeout=30, check=False)
+        return result.returncode == 0 and os.path.exists(png_path)
+
+
+def default_backends():
+    """All known backends, fastest first"""
+    return [
+        NativeRasterizer(),
+        CairoRasterizer(),
+        CommandRasterizer('rsvg-convert', lambda svg, png, size: [
+            'rsvg-convert', '-w', str(size), '-h', str(size), '-o', png, svg
+        ]),
+        CommandRasterizer('convert', lambda svg, png, size: [
+            'convert', '-background', 'white', '-density', '200', svg, png
+        ]),
+        CommandRasterizer('inkscape', lambda svg, png, size: [
+            'inkscape', '--export-type=png', '--export-filename', png,
+            '--export-width', str(size), '--export-height', str(size), svg
+        ]),
+    ]
+
+
+class RasterizerRegistry:
+    def __init__(self, backends=None):
+        """
+        Probe backends once
+
+        Args:
+            backends: Backends to consider, fastest first (default: all known)
+        """
+        self.backends = [b for b in (backends or default_backends()) if b.available()]
+        self.preferred = None
+
+    @property
+    def names(self):
+        """Names of the backends found on this machine"""
+        return [b.name for b in self.backends]
+
+    def convert(self, svg_path, png_path, size=580):
+        """Rasterize an SVG with the remembered backend, falling back in order
+
+        Returns:
+            Name of the backend that succeeded, or None if all failed
+        """
+        candidates = self.backends
+        if self.preferred:
+            candidates = [self.preferred] + [b for b in self.backends if b is not self.preferred]
+
+        for backend in candidates:
+            try:
+                if backend.convert(svg_path, png_path, size):
+                    if self.preferred is None:
+                        self.preferred = backend
+                    return backend.name
+            except Exception as e:
+                logging.error(f"{backend.name} rasterizer failed: {e}")
+
+        return None
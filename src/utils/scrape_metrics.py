@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Scrape Metrics
+Per-phase timing and resource records for the scrapers and monitor
+
+Each scrape attempt appends one JSON line with phase durations, peak RSS
+(including a live browser's, when the caller can probe it) and bytes
+transferred. Run this module with "report" to print p50/p95
+per phase.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# Add repository root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.utils.metrics_registry import SCRAPES, SCRAPE_FAILURES, SCRAPE_BYTES, SCRAPE_SECONDS
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+DEFAULT_METRICS_FILE = 'scrape_metrics.jsonl'
+
+# Sums bytes on the wire for the current document and its subresources
+TRANSFER_SIZE_JS = '''() => {
+    return performance.getEntriesByType('navigation')
+        .concat(performance.getEntriesByType('resource'))
+        .reduce((total, entry) => total + (entry.transferSize || 0), 0);
+}'''
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its largest reaped child in MB
+
+    'children' only covers child processes that have exited and been
+    waited for (the browser and its driver once sync_playwright() has
+    exited), and is the largest single process, not the sum of the tree.
+    """
+    if not HAS_RESOURCE:
+        return {'self': None, 'children': None}
+
+    # ru_maxrss is in kilobytes on Linux but bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {
+        'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1)
+    }
+
+
+class ScrapeMetrics:
+    def __init__(self, source, metrics_file=None, rss_probe=None):
+        """
+        Start recording one scrape attempt
+
+        Args:
+            source: Name of the component being measured (e.g. "scraper")
+            metrics_file: JSONL output path (default: QR_METRICS_FILE or scrape_metrics.jsonl)
+            rss_probe: Callable returning a live browser's RSS in MB (or None),
+                sampled at every phase boundary; needed for a browser that
+                outlives the attempt, which RUSAGE_CHILDREN never sees
+        """
+        self.source = source
+        self.rss_probe = rss_probe
+        self.browser_peak_mb = None
+        self.metrics_file = Path(metrics_file or os.getenv('QR_METRICS_FILE', DEFAULT_METRICS_FILE))
+        self.phases = {}
+        self.bytes_transferred = 0
+        self._started = time.perf_counter()
+        self._current = None
+        self._current_start = None
+
+    def begin(self, name):
+        """Start timing a phase, ending whichever phase is running"""
+        self.end()
+        self.sample_rss()
+        self._current = name
+        self._current_start = time.perf_counter()
+
+    def end(self):
+        """End the running phase, if any"""
+        if self._current:
+            elapsed = time.perf_counter() - self._current_start
+            self.phases[self._current] = self.phases.get(self._current, 0.0) + elapsed
+            self._current = None
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block as a phase"""
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def sample_rss(self):
+        """Fold the probe's current browser RSS into the peak"""
+        if not self.rss_probe:
+            return
+        try:
+            rss = self.rss_probe()
+        except Exception:
+            return
+        if rss is not None and (self.browser_peak_mb is None or rss > self.browser_peak_mb):
+            self.browser_peak_mb = rss
+
+    def add_bytes(self, count):
+        """Add transferred bytes (ignores missing values)"""
+        if count:
+            self.bytes_transferred += int(count)
+
+    def finish(self, success, **extra):
+        """Close the record and append it to the metrics file
+
+        Returns:
+            The written record
+        """
+        self.end()
+        self.sample_rss()
+        rss = peak_rss_mb()
+        if self.rss_probe:
+            rss['browser'] = round(self.browser_peak_mb, 1) if self.browser_peak_mb is not None else None
+        record = {
+            'timestamp': datetime.now().isoformat(),
+            'source': self.source,
+            'success': bool(success),
+            'total_seconds': round(time.perf_counter() - self._started, 4),
+            'phases': {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            'peak_rss_mb': rss,
+            'bytes_transferred': self.bytes_transferred
+        }
+        record.update(extra)
+
+        SCRAPES.inc(source=self.source)
+        if not success:
+            SCRAPE_FAILURES.inc(source=self.source)
+        SCRAPE_BYTES.inc(self.bytes_transferred, source=self.source)
+        SCRAPE_SECONDS.observe(record['total_seconds'], source=self.source)
+
+        try:
+            with open(self.metrics_file, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError as e:
+            print(f"⚠️  Could not write metrics: {e}")
+
+        return record
+
+
+def load_records(metrics_file, source=None):
+    """Read metric records, optionally filtered by source"""
+    records = []
+    with open(metrics_file, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Skip a partially written last line
+            if source is None or record.get('source') == source:
+                records.append(record)
+    return records
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def print_report(records):
+    """Print p50/p95 per phase"""
+    if not records:
+        print("No metrics recorded yet")
+        return
+
+    by_phase = {}
+    for record in records:
+        for name, seconds in record.get('phases', {}).items():
+            by_phase.setdefault(name, []).append(seconds)
+        by_phase.setdefault('total', []).append(record.get('total_seconds', 0))
+
+    successes = sum(1 for r in records if r.get('success'))
+    print(f"📊 {len(records)} records ({successes} successful)")
+    print(f"{'phase':<18}{'count':>7}{'p50 (s)':>10}{'p95 (s)':>10}")
+    for name, values in by_phase.items():
+        print(f"{name:<18}{len(values):>7}{percentile(values, 50):>10.2f}{percentile(values, 95):>10.2f}")
+
+    rss = [r['peak_rss_mb']['children'] for r in records if r.get('peak_rss_mb', {}).get('children')]
+    if rss:
+        print(f"\nPeak child RSS: p50 {percentile(rss, 50):.0f} MB, p95 {percentile(rss, 95):.0f} MB")
+
+    browser_rss = [r['peak_rss_mb']['browser'] for r in records if r.get('peak_rss_mb', {}).get('browser')]
+    if browser_rss:
+        print(f"Peak live browser RSS: p50 {percentile(browser_rss, 50):.0f} MB, "
+              f"p95 {percentile(browser_rss, 95):.0f} MB")
+
+    transferred = [r['bytes_transferred'] for r in records if r.get('bytes_transferred')]
+    if transferred:
+        print(f"Bytes transferred: p50 {percentile(transferred, 50) / 1024:.0f} KB, p95 {percentile(transferred, 95) / 1024:.0f} KB")
+
+
+def main():
+    """Command line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Scrape metrics report')
+    parser.add_argument('command', choices=['report'], help='Command to run')
+    parser.add_argument('--file', default=os.getenv('QR_METRICS_FILE', DEFAULT_METRICS_FILE),
+                       help='Metrics JSONL file (default: scrape_metrics.jsonl)')
+    parser.add_argument('--source', default=None,
+                       help='Only include records from this source (scraper, github_scraper, monitor)')
+
+    args = parser.parse_args()
+
+    try:
+        records = load_records(args.file, args.source)
+    except FileNotFoundError:
+        print(f"❌ Metrics file not found: {args.file}")
+        sys.exit(1)
+
+    print_report(records)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Prediction-Driven Scrape Scheduler
+Skips the browser when the stored QR code already matches the current slot
+
+Codes only change at 2-hour slot boundaries, so a scrape is only useful
+when the latest stored payload belongs to an older slot. When it does,
+the scheduler scrapes in a short burst until the new slot's code shows up.
+"""
+
+import os
+import sys
+import time
+import pytz
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add repository root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.core.qr_generator import RiseGymQRGenerator
+from src.core.qr_matrix import decode_svg
+from src.utils.metrics_registry import DECODE_SECONDS
+
+# Facility + MMDDYYYY + slot hour. The trailing MMSS is a revision counter
+# the gym bumps within a slot, so it cannot be predicted.
+SLOT_PREFIX_LENGTH = 14
+
+# Time zone the gym's slots roll over in (matches the archived payloads)
+DEFAULT_GYM_TIMEZONE = 'Europe/Dublin'
+
+
+def seconds_until_next_sample(interval, offset=0, timezone=None, now=None):
+    """Seconds until the next sample on a grid aligned to gym-local midnight
+
+    Slot boundaries fall on this grid whenever interval divides two hours,
+    and the grid follows the wall clock across DST changes.
+
+    Args:
+        interval: Seconds between samples
+        offset: Seconds after each grid point to sample at
+        timezone: Gym time zone (default: RISE_GYM_TIMEZONE or Europe/Dublin)
+        now: Aware datetime to measure from (default: current time)
+    """
+    tz = pytz.timezone(timezone or os.getenv('RISE_GYM_TIMEZONE', DEFAULT_GYM_TIMEZONE))
+    now = (now or datetime.now(pytz.utc)).astimezone(tz)
+
+    # Step on naive wall-clock time, then localize the chosen point
+    wall = now.replace(tzinfo=None)
+    midnight = wall.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = (wall - midnight).total_seconds() - offset
+    target = midnight + timedelta(seconds=(elapsed // interval + 1) * interval + offset)
+
+    return max(0.0, (tz.localize(target) - now).total_seconds())
+
+
+def slot_window(payload, timezone=None):
+    """Start and end of the slot a payload (or slot prefix) belongs to
+
+    Args:
+        payload: QR payload or its first SLOT_PREFIX_LENGTH characters
+        timezone: Gym time zone (default: RISE_GYM_TIMEZONE or Europe/Dublin)
+
+    Returns:
+        Tuple of aware (start, end) datetimes
+
+    Raises:
+        ValueError: If the payload does not carry a MMDDYYYYHH slot
+    """
+    tz = pytz.timezone(timezone or os.getenv('RISE_GYM_TIMEZONE', DEFAULT_GYM_TIMEZONE))
+    start = datetime.strptime(payload[4:SLOT_PREFIX_LENGTH], "%m%d%Y%H")
+    return tz.localize(start), tz.localize(start + timedelta(hours=2))
+
+
+class PredictiveScrapeScheduler:
+    def __init__(self, qr_dir="real_qr_codes", timezone=None,
+                 burst_interval=60, burst_window=600):
+        """
+        Initialize scheduler
+
+        Args:
+            qr_dir: Directory holding scraped SVGs named YYYYMMDDHHMMSS.svg
+            timezone: Gym time zone (default: RISE_GYM_TIMEZONE or Europe/Dublin)
+            burst_interval: Seconds between scrapes while waiting for a rollover
+            burst_window: Maximum seconds to keep bursting before giving up
+        """
+        self.qr_dir = Path(qr_dir)
+        self.generator = RiseGymQRGenerator(
+            timezone or os.getenv('RISE_GYM_TIMEZONE', DEFAULT_GYM_TIMEZONE)
+        )
+        self.burst_interval = burst_interval
+        self.burst_window = burst_window
+
+    def latest_svg(self):
+        """Return the newest stored SVG path (filenames sort by time)"""
+        try:
+            names = [entry.name for entry in os.scandir(self.qr_dir)
+                     if entry.name.endswith('.svg') and entry.is_file()]
+        except FileNotFoundError:
+            return None
+        return self.qr_dir / max(names) if names else None
+
+    def latest_payload(self):
+        """Decode the payload of the newest stored SVG"""
+        latest = self.latest_svg()
+        if not latest:
+            return None
+        try:
+            with open(latest, 'r') as f:
+                return decode_svg(f.read())
+        except OSError:
+            return None
+
+    def expected_payload(self, now=None):
+        """Predict the payload for the slot containing now"""
+        return self.generator.generate_qr_data(now or datetime.now(self.generator.timezone))
+
+    def matches_slot(self, payload, now=None):
+        """Check whether a payload belongs to the current slot"""
+        if not payload:
+            return False
+        expected = self.expected_payload(now)
+        return payload[:SLOT_PREFIX_LENGTH] == expected[:SLOT_PREFIX_LENGTH]
+
+    def seconds_into_slot(self, now=None):
+        """Seconds elapsed since the current slot started"""
+        now = now or datetime.now(self.generator.timezone)
+        slot_start = now.replace(hour=(now.hour // 2) * 2, minute=0, second=0, microsecond=0)
+        return (now - slot_start).total_seconds()
+
+    def run(self, scraper, headless=True, max_retries=3):
+        """Scrape only if the stored code is stale, bursting until it rolls over
+
+        Returns:
+            Tuple of (status, filename) where status is 'skipped', 'updated'
+            or 'stale' (the scraped code still does not match the slot)
+        """
+        latest = self.latest_payload()
+        expected = self.expected_payload()
+        print(f"🔮 Expected slot: {expected[:SLOT_PREFIX_LENGTH]}")
+        print(f"💾 Stored payload: {latest or 'none'}")
+
+        if self.matches_slot(latest):
+            print("✅ Stored QR code matches the current slot - skipping browser")
+            return 'skipped', None
+
+        # Only burst right after a rollover; a mismatch mid-slot means the
+        # prediction is off, so scrape once like the plain scheduled run
+        burst = self.seconds_into_slot() < self.burst_window
+        deadline = time.monotonic() + (self.burst_window if burst else 0)
+        filename = None
+        while True:
+            filename = scraper.scrape_qr_code(headless=headless, max_retries=max_retries)
+            if filename:
+                with open(filename, 'r') as f:
+                    svg_content = f.read()
+                with DECODE_SECONDS.time():
+                    payload = decode_svg(svg_content)
+                print(f"🔍 Scraped payload: {payload or 'undecodable'}")
+                if self.matches_slot(payload):
+                    return 'updated', filename
+
+            if time.monotonic() + self.burst_interval > deadline:
+                print("⚠️  Scraped QR code does not match the predicted slot")
+                return 'stale', filename
+
+            print(f"⏳ Waiting {self.burst_interval}s for rollover...")
+            time.sleep(self.burst_interval)
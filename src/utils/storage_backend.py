@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Storage Backends
+Blob storage for upload_to_firebase.py
+
+FirebaseStorageBackend wraps a firebase_admin bucket. LocalStorageBackend
+keeps blobs in a directory with JSON metadata sidecars (content type,
+custom metadata, MD5), so sync and backfill work can be developed and
+benchmarked against thousands of blobs without credentials or a network.
+Both report MD5s base64 encoded, the way Cloud Storage does.
+"""
+
+import os
+import sys
+import json
+import base64
+import hashlib
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+
+# Add repository root to path to import from src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.data.qr_database import write_json_atomic
+
+# Optional: only needed for the Firebase backend
+try:
+    import firebase_admin
+    from firebase_admin import credentials, storage
+    HAS_FIREBASE_ADMIN = True
+except ImportError:
+    HAS_FIREBASE_ADMIN = False
+
+METADATA_DIR = '.metadata'
+
+
+def md5_base64(path):
+    """Base64 MD5 of a file, as Cloud Storage reports md5Hash"""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return base64.b64encode(digest.digest()).decode()
+
+
+class StorageBackend(ABC):
+    """Operations upload_to_firebase needs from a bucket"""
+
+    @abstractmethod
+    def list_md5(self, prefix):
+        """
+        List blobs under a prefix in one call
+
+        Returns:
+            Dict of blob name -> base64 MD5
+        """
+
+    @abstractmethod
+    def upload(self, local_path, storage_path, metadata, content_type):
+        """
+        Upload a file as a publicly readable blob
+
+        Returns:
+            Public URL of the blob
+        """
+
+    def prepare_workers(self, workers):
+        """Size shared resources for this many concurrent uploads"""
+
+
+class FirebaseStorageBackend(StorageBackend):
+    def __init__(self, bucket):
+        """
+        Initialize backend
+
+        Args:
+            bucket: google.cloud.storage Bucket (e.g. firebase_admin.storage.bucket())
+        """
+        self.bucket = bucket
+
+    @classmethod
+    def from_service_account(cls, service_account_path, storage_bucket):
+        """Initialize the Firebase Admin SDK and wrap its default bucket"""
+        if not HAS_FIREBASE_ADMIN:
+            raise ImportError("firebase_admin is required for Firebase Storage (pip install firebase-admin)")
+        cred = credentials.Certificate(service_account_path)
+        firebase_admin.initialize_app(cred, {
+            'storageBucket': storage_bucket
+        })
+        return cls(storage.bucket())
+
+    def list_md5(self, prefix):
+        return {blob.name: blob.md5_hash
+                for blob in self.bucket.list_blobs(prefix=prefix,
+                                                   fields='items(name,md5Hash),nextPageToken')}
+
+    def upload(self, local_path, storage_path, metadata, content_type):
+        blob = self.bucket.blob(storage_path)
+        blob.metadata = metadata
+
+        # Upload file with metadata and a public-read ACL in one request
+        blob.upload_from_filename(local_path, content_type=content_type,
+                                  predefined_acl='publicRead')
+        return blob.public_url
+
+    def prepare_workers(self, workers):
+        # Size the client's one authorized session for the worker threads.
+        # _http is not public API; without it uploads still work, just
+        # with the session's default pool
+        session = getattr(self.bucket.client, '_http', None)
+        if not hasattr(session, 'mount'):
+            print("⚠️  Storage client session not reachable, keeping its default connection pool")
+            return
+        session.mount('https://', HTTPAdapter(pool_connections=workers, pool_maxsize=workers))
+
+
+class LocalStorageBackend(StorageBackend):
+    def __init__(self, root, base_url=None):
+        """
+        Initialize backend
+
+        Args:
+            root: Directory holding the blobs
+            base_url: URL the directory is served at (default: file:// URLs)
+        """
+        self.root = Path(root).resolve()
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def metadata_path(self, storage_path):
+        return self.root / METADATA_DIR / f"{storage_path}.json"
+
+    def public_url(self, storage_path):
+        if self.base_url:
+            return f"{self.base_url}/{storage_path}"
+        return (self.root / storage_path).as_uri()
+
+    def list_md5(self, prefix):
+        # Walk only the directory the prefix points into, reading the
+        # MD5s recorded at upload time instead of rehashing every blob
+        meta_root = self.root / METADATA_DIR
+        start = meta_root / os.path.dirname(prefix)
+        blobs = {}
+        for dirpath, _, filenames in os.walk(start):
+            for filename in filenames:
+                meta_file = Path(dirpath) / filename
+                name = meta_file.relative_to(meta_root).as_posix()[:-len('.json')]
+                if not name.startswith(prefix):
+                    continue
+                try:
+                    with open(meta_file, 'r') as f:
+                        blobs[name] = json.load(f)['md5Hash']
+                except (OSError, ValueError, KeyError):
+                    continue
+        return blobs
+
+    def upload(self, local_path, storage_path, metadata, content_type):
+        target = self.root / storage_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        # Copy through a temp file so readers never see a partial blob
+        digest = hashlib.md5()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+        try:
+            with open(local_path, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+                for chunk in iter(lambda: src.read(1024 * 1024), b''):
+                    digest.update(chunk)
+                    dst.write(chunk)
+                    size += len(chunk)
+            os.chmod(tmp_path, 0o644)  # mkstemp creates files 0600
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        meta_file = self.metadata_path(storage_path)
+        meta_file.parent.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(meta_file, {
+            'name': storage_path,
+            'contentType': content_type,
+            'metadata': metadata,
+            'md5Hash': base64.b64encode(digest.digest()).decode(),
+            'size': size,
+            'updated': datetime.now(timezone.utc).isoformat()
+        })
+        return self.public_url(storage_path)
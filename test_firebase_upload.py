@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
 """Test Firebase upload with the user's database"""
 
+import os
 import requests
 import json
 from datetime import datetime
 
 # Firebase database URL from the google-services.json
-DATABASE_URL = "https://rise-gym-qr-default-rtdb.europe-west1.firebasedatabase.app"
+# Set FIREBASE_DATABASE_URL to test against another database (e.g. src/utils/local_rtdb.py)
+DATABASE_URL = os.environ.get(
+    "FIREBASE_DATABASE_URL",
+    "https://rise-gym-qr-default-rtdb.europe-west1.firebasedatabase.app"
+).rstrip("/")
 
 # Generate test QR data
 timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
@@ -0,0 +1,89 @@
+"""Tests for the resumable Firebase history backfill"""
+
+import os
+import sys
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.qr_generator import RiseGymQRGenerator
+from src.utils.firebase_backfill import HistoryBackfill, scan_codes
+from src.utils.firebase_uploader import FirebaseUploader
+from src.utils.local_rtdb import LocalRTDB
+
+
+@pytest.fixture
+def db():
+    server = LocalRTDB(port=0, data={'latest': {'timestamp': 'untouched'}}).start()
+    yield server
+    server.stop()
+
+
+def write_codes(qr_dir, count):
+    generator = RiseGymQRGenerator()
+    qr_dir.mkdir()
+    start = datetime(2025, 6, 22)
+    timestamps = []
+    for i in range(count):
+        when = start + timedelta(hours=2 * i)
+        (qr_dir / f"{when:%Y%m%d%H%M%S}.svg").write_text(
+            generator.generate_svg_native(generator.generate_qr_data(when)))
+        timestamps.append(f"{when:%Y%m%d%H%M%S}")
+    return timestamps
+
+
+def make_backfill(db, tmp_path, **kwargs):
+    uploader = FirebaseUploader(db.url, cache_file=tmp_path / 'cache.json', max_retries=0,
+                                history_mode='slim')
+    kwargs.setdefault('chunk_size', 3)
+    kwargs.setdefault('workers', 1)
+    return HistoryBackfill(uploader, tmp_path / 'codes', rate=1000,
+                           checkpoint_file=tmp_path / 'checkpoint.json', **kwargs)
+
+
+def test_backfill_uploads_history_in_chunks_and_leaves_latest(db, tmp_path):
+    timestamps = write_codes(tmp_path / 'codes', 7)
+
+    assert make_backfill(db, tmp_path, workers=3).run() == (7, 0)
+    assert sorted(db.get(['qr_codes'])) == timestamps
+    assert db.get(['latest']) == {'timestamp': 'untouched'}
+    assert db.snapshot_stats()['patch_requests'] == 3
+
+    with open(tmp_path / 'checkpoint.json') as f:
+        assert json.load(f) == {'databaseUrl': db.url, 'done': timestamps}
+
+
+def test_failed_chunk_is_retried_on_the_next_run(db, tmp_path):
+    timestamps = write_codes(tmp_path / 'codes', 7)
+    db.fail_next(503)
+
+    assert make_backfill(db, tmp_path).run() == (4, 3)
+    assert sorted(db.get(['qr_codes'])) == timestamps[3:]
+
+    db.stats.clear()
+    assert make_backfill(db, tmp_path).run() == (3, 0)
+    assert sorted(db.get(['qr_codes'])) == timestamps
+    assert db.snapshot_stats()['patch_requests'] == 1
+
+    # Nothing left to do
+    assert make_backfill(db, tmp_path).run() == (0, 0)
+
+
+def test_checkpoint_for_another_database_is_ignored(db, tmp_path):
+    timestamps = write_codes(tmp_path / 'codes', 4)
+    with open(tmp_path / 'checkpoint.json', 'w') as f:
+        json.dump({'databaseUrl': 'https://other.firebaseio.com', 'done': timestamps}, f)
+
+    assert make_backfill(db, tmp_path).run() == (4, 0)
+
+
+def test_dedupe_drops_consecutive_identical_files(tmp_path):
+    timestamps = write_codes(tmp_path / 'codes', 3)
+    duplicate = tmp_path / 'codes' / '20250622010000.svg'
+    duplicate.write_text((tmp_path / 'codes' / f"{timestamps[0]}.svg").read_text())
+
+    assert [ts for ts, _ in scan_codes(tmp_path / 'codes')] == sorted(timestamps + ['20250622010000'])
+    assert [ts for ts, _ in scan_codes(tmp_path / 'codes', dedupe=True)] == timestamps
@@ -0,0 +1,85 @@
+"""Tests for /upcoming publishing and confirmation"""
+
+import os
+import sys
+import base64
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.qr_generator import RiseGymQRGenerator
+from src.core.qr_matrix import decode_matrix, unpack_matrix
+from src.utils.firebase_uploader import FirebaseUploader
+from src.utils.firebase_upcoming import publish_upcoming
+from src.utils.local_rtdb import LocalRTDB
+
+TIMEZONE = 'Europe/Dublin'
+
+
+def make_uploader(db, tmp_path):
+    return FirebaseUploader(db.url, cache_file=tmp_path / 'cache.json', max_retries=0)
+
+
+def write_svg(tmp_path, when):
+    generator = RiseGymQRGenerator(TIMEZONE)
+    path = tmp_path / f"{when:%Y%m%d%H%M%S}.svg"
+    path.write_text(generator.generate_svg_native(generator.generate_qr_data(when)))
+    return path
+
+
+def test_predicted_entries_are_marked_predicted(tmp_path, monkeypatch):
+    monkeypatch.setenv('RISE_GYM_TIMEZONE', TIMEZONE)
+    db = LocalRTDB(port=0).start()
+    try:
+        uploader = make_uploader(db, tmp_path)
+        generator = RiseGymQRGenerator(TIMEZONE)
+        now = generator.timezone.localize(datetime(2025, 6, 22, 9, 30))
+        assert publish_upcoming(uploader, days=1, now=now)
+
+        upcoming = db.get(['upcoming'])
+        assert len(upcoming) == 12
+        for slot, entry in upcoming.items():
+            assert entry['predicted'] is True
+            assert entry['confirmed'] is False
+            assert entry['slotPrefix'] == slot
+            assert entry['payload'].startswith(slot)
+            assert entry['matrixSize'] == 21
+            for field in ('svgContent', 'bitmapBase64'):
+                assert field not in entry
+
+        current = upcoming['92680622202508']
+        matrix = unpack_matrix(base64.b64decode(current['bits']), current['matrixSize'])
+        assert decode_matrix(matrix) == current['payload']
+    finally:
+        db.stop()
+
+
+def test_upload_confirms_slot_with_a_pointer_and_publisher_prunes(tmp_path, monkeypatch):
+    monkeypatch.setenv('RISE_GYM_TIMEZONE', TIMEZONE)
+    generator = RiseGymQRGenerator(TIMEZONE)
+    now = datetime.now(generator.timezone)
+    current = generator.generate_qr_data(now)[:14]
+    ended = generator.generate_qr_data(now - timedelta(days=1))[:14]
+    db = LocalRTDB(port=0, data={'upcoming': {
+        current: {'confirmed': False, 'predicted': True},
+        ended: {'confirmed': False, 'predicted': True}
+    }}).start()
+    try:
+        uploader = make_uploader(db, tmp_path)
+
+        svg_path = write_svg(tmp_path, now)
+        assert uploader.upload_qr_code(svg_path, 'p')
+        confirmed = db.get(['upcoming', current])
+        assert confirmed['confirmed'] is True
+        assert 'predicted' not in confirmed
+        assert confirmed['timestamp'] == svg_path.stem
+        assert confirmed['contentHash'] == db.get(['latest', 'contentHash'])
+        assert 'svgContent' not in confirmed and 'bits' not in confirmed
+
+        # The publisher keeps the confirmed slot and drops the ended one
+        assert publish_upcoming(uploader, days=1)
+        upcoming = db.get(['upcoming'])
+        assert ended not in upcoming
+        assert upcoming[current] == confirmed
+    finally:
+        db.stop()
@@ -0,0 +1,153 @@
+"""Tests for Firebase uploader request handling against the local database"""
+
+import os
+import sys
+from datetime import datetime
+
+import pytest
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.qr_generator import RiseGymQRGenerator
+from src.utils import firebase_uploader
+from src.utils.firebase_uploader import FirebaseUploader
+from src.utils.local_rtdb import LocalRTDB
+from src.utils.metrics_registry import UPLOAD_BYTES, UPLOAD_RAW_BYTES
+
+
+def counter_value(counter):
+    return float(next(counter.samples()).split()[-1])
+
+
+@pytest.fixture
+def db():
+    server = LocalRTDB(port=0).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(firebase_uploader.time, 'sleep', delays.append)
+    return delays
+
+
+def make_uploader(db, tmp_path, **kwargs):
+    return FirebaseUploader(db.url, cache_file=tmp_path / 'cache.json', **kwargs)
+
+
+def test_retry_after_is_honored_and_capped(db, tmp_path, sleeps):
+    uploader = make_uploader(db, tmp_path, max_retries=3, backoff_cap=5.0)
+    db.fail_next(503, retry_after=2)
+    db.fail_next(429, retry_after=120)
+
+    response = uploader.request('GET', "latest.json")
+    assert response.status_code == 200
+    assert sleeps == [2.0, 5.0]
+    assert db.snapshot_stats()['requests'] == 3
+
+
+def test_backoff_without_retry_after_stays_under_the_ceiling(db, tmp_path, sleeps):
+    uploader = make_uploader(db, tmp_path, max_retries=3, backoff_base=0.5)
+    db.fail_next(502, count=3)
+
+    assert uploader.request('GET', "latest.json").status_code == 200
+    assert len(sleeps) == 3
+    for attempt, delay in enumerate(sleeps):
+        assert 0 <= delay <= 0.5 * 2 ** attempt
+
+
+def test_last_error_response_is_returned_when_retries_run_out(db, tmp_path, sleeps):
+    uploader = make_uploader(db, tmp_path, max_retries=1)
+    db.fail_next(503, count=5)
+
+    assert uploader.request('GET', "latest.json").status_code == 503
+    assert len(sleeps) == 1
+    assert db.snapshot_stats()['requests'] == 2
+
+
+def test_client_errors_are_not_retried(db, tmp_path, sleeps):
+    uploader = make_uploader(db, tmp_path, max_retries=3)
+    db.fail_next(401)
+
+    assert uploader.request('GET', "latest.json").status_code == 401
+    assert sleeps == []
+
+
+def test_connection_errors_raise_after_the_last_retry(tmp_path, sleeps):
+    server = LocalRTDB(port=0).start()
+    url = server.url
+    server.stop()
+
+    uploader = FirebaseUploader(url, cache_file=tmp_path / 'cache.json', max_retries=2)
+    with pytest.raises(requests.ConnectionError):
+        uploader.request('GET', "latest.json")
+    assert len(sleeps) == 2
+
+
+def test_wire_bytes_count_every_attempt(db, tmp_path, sleeps):
+    uploader = make_uploader(db, tmp_path, max_retries=2, compress_requests=True)
+    db.fail_next(503, count=2)
+    wire_before, raw_before = counter_value(UPLOAD_BYTES), counter_value(UPLOAD_RAW_BYTES)
+
+    response, raw_bytes, wire_bytes = uploader.send_json('PATCH', ".json", {'latest/pattern': 'x' * 500})
+    assert response.status_code == 204
+    assert db.get(['latest', 'pattern']) == 'x' * 500
+    assert counter_value(UPLOAD_BYTES) - wire_before == 3 * wire_bytes == db.snapshot_stats()['bytes_in']
+    assert counter_value(UPLOAD_RAW_BYTES) - raw_before == raw_bytes
+
+
+def write_svg(tmp_path, timestamp, when):
+    generator = RiseGymQRGenerator()
+    path = tmp_path / f"{timestamp}.svg"
+    path.write_text(generator.generate_svg_native(generator.generate_qr_data(when)))
+    return path
+
+
+def test_unchanged_content_is_skipped_from_the_local_cache(db, tmp_path):
+    uploader = make_uploader(db, tmp_path)
+    svg_path = write_svg(tmp_path, '20250622100000', datetime(2025, 6, 22, 10))
+
+    assert uploader.upload_qr_code(svg_path, 'p')
+    assert not uploader.last_skipped
+    requests_after_upload = db.snapshot_stats()['requests']
+
+    assert uploader.upload_qr_code(svg_path, 'p')
+    assert uploader.last_skipped
+    assert db.snapshot_stats()['requests'] == requests_after_upload
+
+
+def test_remote_content_hash_is_checked_without_a_usable_cache(db, tmp_path):
+    svg_path = write_svg(tmp_path, '20250622100000', datetime(2025, 6, 22, 10))
+    assert make_uploader(db, tmp_path).upload_qr_code(svg_path, 'p')
+    content_hash = db.get(['latest', 'contentHash'])
+
+    # A fresh machine has no cache, so it reads only latest/contentHash
+    db.stats.clear()
+    uploader = FirebaseUploader(db.url, cache_file=tmp_path / 'fresh.json')
+    assert uploader.upload_qr_code(svg_path, 'p')
+    assert uploader.last_skipped
+    assert db.snapshot_stats()['requests'] == db.snapshot_stats()['get_requests'] == 1
+
+    # A cache written for another database is ignored
+    empty = LocalRTDB(port=0).start()
+    try:
+        assert not make_uploader(empty, tmp_path).is_current(content_hash)
+    finally:
+        empty.stop()
+
+
+def test_changed_content_and_force_upload(db, tmp_path):
+    uploader = make_uploader(db, tmp_path)
+    first = write_svg(tmp_path, '20250622100000', datetime(2025, 6, 22, 10))
+    second = write_svg(tmp_path, '20250622120000', datetime(2025, 6, 22, 12))
+
+    assert uploader.upload_qr_code(first, 'p')
+    assert uploader.upload_qr_code(second, 'p')
+    assert not uploader.last_skipped
+    assert db.get(['latest', 'timestamp']) == '20250622120000'
+
+    assert uploader.upload_qr_code(second, 'p', force=True)
+    assert not uploader.last_skipped
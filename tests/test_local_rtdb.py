@@ -0,0 +1,94 @@
+"""Tests for the local Realtime Database stand-in"""
+
+import os
+import sys
+import gzip
+import json
+
+import pytest
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.local_rtdb import LocalRTDB
+
+
+@pytest.fixture
+def db():
+    server = LocalRTDB(port=0, data={'qr_codes': {
+        '20250622080000': {'pattern': 'a', 'bits': 'x'},
+        '20250622100000': {'pattern': 'b', 'bits': 'y'},
+        '20250622120000': {'pattern': 'c', 'bits': 'z'}
+    }}).start()
+    yield server
+    server.stop()
+
+
+def test_shallow_get_returns_keys_only(db):
+    response = requests.get(f"{db.url}/qr_codes.json", params={'shallow': 'true'})
+    assert response.json() == {'20250622080000': True, '20250622100000': True, '20250622120000': True}
+
+    response = requests.get(f"{db.url}/qr_codes.json",
+                            params={'shallow': 'true', 'orderBy': '"$key"', 'limitToLast': '1'})
+    assert response.status_code == 400
+
+
+def test_key_ordered_range_queries(db):
+    response = requests.get(f"{db.url}/qr_codes.json", params={'orderBy': '"$key"', 'limitToLast': '2'})
+    assert list(response.json()) == ['20250622100000', '20250622120000']
+
+    response = requests.get(f"{db.url}/qr_codes.json", params={'limitToLast': '2'})
+    assert response.status_code == 400
+
+
+def test_multi_path_patch_applies_every_path_and_deletes_nulls(db):
+    response = requests.patch(f"{db.url}/.json", json={
+        'latest': {'pattern': 'd'},
+        'qr_codes/20250622140000': {'pattern': 'd'},
+        'qr_codes/20250622080000': None
+    })
+    assert response.status_code == 200
+    assert db.get(['latest']) == {'pattern': 'd'}
+    assert set(db.get(['qr_codes'])) == {'20250622100000', '20250622120000', '20250622140000'}
+
+    # Deleting the last child removes the emptied parent too
+    requests.patch(f"{db.url}/.json", json={'latest/pattern': None})
+    assert db.get(['latest']) is None
+
+
+def test_multi_path_patch_rejects_overlapping_paths(db):
+    response = requests.patch(f"{db.url}/.json", json={
+        'qr_codes': {'20250622140000': {'pattern': 'd'}},
+        'qr_codes/20250622160000': {'pattern': 'e'}
+    })
+    assert response.status_code == 400
+    assert 'ancestor' in response.json()['error']
+    # Nothing from the rejected update is applied
+    assert set(db.get(['qr_codes'])) == {'20250622080000', '20250622100000', '20250622120000'}
+
+
+def test_gzip_bodies_and_silent_responses(db):
+    raw = json.dumps({'latest': {'pattern': 'g'}}).encode()
+    body = gzip.compress(raw)
+    response = requests.patch(f"{db.url}/.json", data=body, params={'print': 'silent'},
+                              headers={'Content-Encoding': 'gzip'})
+    assert response.status_code == 204
+    assert response.content == b''
+    assert db.get(['latest', 'pattern']) == 'g'
+
+    stats = db.snapshot_stats()
+    assert stats['bytes_in'] == len(body)
+    assert stats['bytes_in_raw'] == len(raw)
+
+    response = requests.patch(f"{db.url}/.json", data=b'not gzip', headers={'Content-Encoding': 'gzip'})
+    assert response.status_code == 400
+
+
+def test_injected_failures_are_served_before_the_request(db):
+    db.fail_next(503, count=2, retry_after=3)
+    for _ in range(2):
+        response = requests.get(f"{db.url}/qr_codes.json", params={'shallow': 'true'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '3'
+    assert requests.get(f"{db.url}/qr_codes.json", params={'shallow': 'true'}).status_code == 200
+    assert db.snapshot_stats()['errors'] == 2
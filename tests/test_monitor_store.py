@@ -0,0 +1,83 @@
+"""Tests for the monitor event log"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.monitor_store import MonitorEventLog
+
+
+def sample(status, hash_value):
+    return {'status': status, 'timestamp': '2025-06-22T00:00:00', 'hash': hash_value}
+
+
+def test_append_after_torn_tail_survives_reload(tmp_path):
+    log_path = tmp_path / 'events.jsonl'
+    snapshot_path = tmp_path / 'state.json'
+
+    log = MonitorEventLog(log_path, snapshot_path)
+    log.load()
+    for hash_value in ('a', 'b', 'c'):
+        log.append(sample('SAME', hash_value))
+    log.close()
+
+    # Simulate a crash part-way through writing the fourth event
+    with open(log_path, 'a') as f:
+        f.write('{"status": "DIFF')
+
+    log = MonitorEventLog(log_path, snapshot_path)
+    assert log.load()['seq'] == 3
+    for hash_value in ('d', 'e', 'f', 'g'):
+        log.append(sample('DIFFERENT', hash_value))
+    log.close()
+
+    state = MonitorEventLog(log_path, snapshot_path).load()
+    assert state['seq'] == 7
+    assert state['last_hash'] == 'g'
+    assert [change['hash'] for change in state['changes']] == ['d', 'e', 'f', 'g']
+
+
+def test_corrupt_line_mid_log_is_skipped(tmp_path):
+    log_path = tmp_path / 'events.jsonl'
+    snapshot_path = tmp_path / 'state.json'
+
+    log = MonitorEventLog(log_path, snapshot_path)
+    log.load()
+    log.append(sample('SAME', 'a'))
+    log.close()
+    with open(log_path, 'a') as f:
+        f.write('not json\n')
+    log = MonitorEventLog(log_path, snapshot_path)
+    log.load()
+    log.append(sample('SAME', 'b'))
+    log.close()
+
+    state = MonitorEventLog(log_path, snapshot_path).load()
+    assert state['seq'] == 2
+    assert state['last_hash'] == 'b'
+
+
+def test_read_only_load_leaves_log_untouched(tmp_path):
+    log_path = tmp_path / 'events.jsonl'
+    snapshot_path = tmp_path / 'state.json'
+
+    log = MonitorEventLog(log_path, snapshot_path)
+    log.load()
+    log.append(sample('SAME', 'a'))
+    log.close()
+    with open(log_path, 'a') as f:
+        f.write('{"status": "DIFF')
+    before = log_path.read_bytes()
+
+    log = MonitorEventLog(log_path, snapshot_path, read_only=True)
+    assert log.load()['seq'] == 1
+    assert log_path.read_bytes() == before
+    try:
+        log.append(sample('SAME', 'b'))
+    except OSError:
+        pass
+    else:
+        raise AssertionError('append on a read-only log should fail')
+    log.close()
+    assert log_path.read_bytes() == before
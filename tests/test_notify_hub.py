@@ -0,0 +1,80 @@
+"""Tests for the notification hub's /publish endpoint"""
+
+import os
+import sys
+import json
+import asyncio
+import urllib.error
+import urllib.request
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.notify_hub import NotificationHub, build_event, post_event
+
+SVG = ('<svg xmlns="http://www.w3.org/2000/svg">'
+       '<rect x="0" y="0" width="20" height="20"/></svg>')
+
+
+class FakeWriter:
+    def __init__(self, host):
+        self.host = host
+
+    def get_extra_info(self, name):
+        return (self.host, 40000) if name == 'peername' else None
+
+
+def post(url, body, token=None):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    request = urllib.request.Request(url, data=body, headers=headers, method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=2) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def run_hub(token, check):
+    async def main():
+        hub = NotificationHub(port=0, token=token)
+        await hub.start()
+        url = f"http://127.0.0.1:{hub.server.sockets[0].getsockname()[1]}/publish"
+        try:
+            await asyncio.to_thread(check, hub, url)
+        finally:
+            await hub.stop()
+    asyncio.run(main())
+
+
+def test_publish_requires_the_token_when_one_is_set(monkeypatch):
+    monkeypatch.delenv('QR_NOTIFY_TOKEN', raising=False)
+    event = build_event(SVG, 'test')
+
+    def check(hub, url):
+        assert post(url, json.dumps(event).encode()) == 403
+        assert post(url, json.dumps(event).encode(), token='wrong') == 403
+        assert post_event(url, event, token='secret')
+        assert [e['hash'] for e in hub.replay] == [event['hash']]
+
+    run_hub('secret', check)
+
+
+def test_publish_without_token_is_loopback_only(monkeypatch):
+    monkeypatch.delenv('QR_NOTIFY_TOKEN', raising=False)
+    hub = NotificationHub()
+    assert hub.may_publish(FakeWriter('127.0.0.1'), {})
+    assert hub.may_publish(FakeWriter('::ffff:127.0.0.1'), {})
+    assert not hub.may_publish(FakeWriter('192.168.1.20'), {})
+
+
+def test_publish_rejects_malformed_events(monkeypatch):
+    monkeypatch.delenv('QR_NOTIFY_TOKEN', raising=False)
+
+    def check(hub, url):
+        for body in (b'[1]', b'{"type": "new_code"}', b'{"type": "x", "hash": "h"}',
+                     b'{"type": "new_code", "hash": "h", "svg": 5}', b'not json'):
+            assert post(url, body) == 400
+        assert not hub.replay
+
+    run_hub(None, check)
@@ -0,0 +1,36 @@
+"""Tests for incremental QR database updates"""
+
+import os
+import sys
+import json
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data.qr_database import add_file
+
+
+def test_concurrent_add_file_keeps_every_entry(tmp_path):
+    database_file = tmp_path / 'qr_code_database.json'
+    svg_files = []
+    for i in range(60):
+        svg_path = tmp_path / f"202506{1 + i // 24:02d}{i % 24:02d}0000.svg"
+        svg_path.write_text('<svg/>')
+        svg_files.append(svg_path)
+
+    def add_all(paths):
+        for path in paths:
+            add_file(path, database_file)
+
+    threads = [threading.Thread(target=add_all, args=(svg_files[k::2],)) for k in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(database_file) as f:
+        database = json.load(f)
+    assert len(database['files']) == 60
+    assert database['metadata']['total_files'] == 60
+    assert [entry['datetime'] for entry in database['files']] == sorted(
+        entry['datetime'] for entry in database['files'])
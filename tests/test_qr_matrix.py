@@ -0,0 +1,33 @@
+"""Tests for native QR module rendering"""
+
+import io
+import os
+import sys
+from datetime import datetime
+
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.qr_generator import RiseGymQRGenerator
+from src.core.qr_matrix import parse_svg_matrix, matrix_to_png
+
+
+def sample_matrix():
+    generator = RiseGymQRGenerator()
+    return parse_svg_matrix(generator.generate_svg_native(generator.generate_qr_data(datetime(2025, 6, 22, 10))))
+
+
+def test_png_is_a_palette_image_centred_on_the_requested_canvas():
+    matrix = sample_matrix()
+    image = Image.open(io.BytesIO(matrix_to_png(matrix, scale=27, border=4, size=800)))
+    assert image.size == (800, 800)
+    assert image.mode == 'P'
+
+    pixels = image.convert('L').load()
+    offset = (800 - 29 * 27) // 2 + 4 * 27
+    for row in range(21):
+        for col in range(21):
+            x, y = offset + col * 27 + 13, offset + row * 27 + 13
+            assert (pixels[x, y] == 0) == matrix[row][col]
+    assert pixels[0, 0] == pixels[799, 799] == 255
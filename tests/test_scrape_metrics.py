@@ -0,0 +1,27 @@
+"""Tests for scrape metric records"""
+
+import os
+import sys
+import json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.scrape_metrics import ScrapeMetrics
+
+
+def test_live_browser_peak_is_sampled_at_phase_boundaries(tmp_path):
+    readings = iter([300.0, 850.04, 410.0, None])
+    metrics = ScrapeMetrics('test', tmp_path / 'metrics.jsonl', rss_probe=lambda: next(readings))
+    metrics.begin('navigation')
+    metrics.begin('login')
+    metrics.begin('extraction')
+
+    record = metrics.finish(True)
+    assert record['peak_rss_mb']['browser'] == 850.0
+    with open(tmp_path / 'metrics.jsonl') as f:
+        assert json.loads(f.readline())['peak_rss_mb']['browser'] == 850.0
+
+
+def test_records_without_a_probe_have_no_browser_field(tmp_path):
+    record = ScrapeMetrics('test', tmp_path / 'metrics.jsonl').finish(False)
+    assert 'browser' not in record['peak_rss_mb']
@@ -1,114 +1,176 @@
 #!/usr/bin/env python3
 """
 Upload QR codes to Firebase Storage for Rise Gym QR App
+
+Uploads go through a storage backend (src/utils/storage_backend.py):
+Firebase Storage, or a local directory with --local for offline runs.
 """
 
-import firebase_admin
-from firebase_admin import credentials, storage
 import os
 import sys
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 
+from src.utils.storage_backend import FirebaseStorageBackend, LocalStorageBackend, md5_base64
+
+# Time slot mapping
+TIME_SLOTS = {
+    "0000": "00:00-01:59",
+    "0200": "02:00-03:59",
+    "0400": "04:00-05:59",
+    "0600": "06:00-07:59",
+    "0800": "08:00-09:59",
+    "1000": "10:00-11:59",
+    "1200": "12:00-13:59",
+    "1400": "14:00-15:59",
+    "1600": "16:00-17:59",
+    "1800": "18:00-19:59",
+    "2000": "20:00-21:59",
+    "2200": "22:00-23:59"
+}
+
+STORAGE_PREFIX = "qr_codes/"
+SYNC_WORKERS = 8
+
 def initialize_firebase(service_account_path, storage_bucket):
     """Initialize Firebase Admin SDK"""
     try:
-        cred = credentials.Certificate(service_account_path)
-        firebase_admin.initialize_app(cred, {
-            'storageBucket': storage_bucket
-        })
+        backend = FirebaseStorageBackend.from_service_account(service_account_path, storage_bucket)
         print(f"✅ Firebase initialized with bucket: {storage_bucket}")
-        return storage.bucket()
+        return backend
     except Exception as e:
         print(f"❌ Failed to initialize Firebase: {e}")
         sys.exit(1)
 
-def upload_qr_code(bucket, local_path, storage_path, time_slot, expires_at=None):
+def store_qr_code(backend, local_path, storage_path, time_slot, expires_at=None):
+    """Upload a single QR code to Firebase Storage without printing
+    
+    Returns:
+        Public URL of the uploaded file (raises on failure)
+    """
+    # Set metadata
+    metadata = {
+        'timeSlot': time_slot,
+        'contentType': 'image/svg+xml',
+        'uploadedAt': datetime.now().isoformat()
+    }
+    
+    if expires_at:
+        metadata['expiresAt'] = str(expires_at)
+    
+    # Upload file with metadata, publicly readable
+    return backend.upload(local_path, storage_path, metadata, 'image/svg+xml')
+
+def report_upload(local_path, storage_path, time_slot, public_url):
+    """Print the result of a successful upload"""
+    print(f"✅ Uploaded {local_path} to {storage_path}")
+    print(f"   Time slot: {time_slot}")
+    print(f"   Public URL: {public_url}")
+
+def upload_qr_code(backend, local_path, storage_path, time_slot, expires_at=None):
     """Upload a single QR code to Firebase Storage"""
     try:
-        blob = bucket.blob(storage_path)
-        
-        # Set metadata
-        metadata = {
-            'timeSlot': time_slot,
-            'contentType': 'image/svg+xml',
-            'uploadedAt': datetime.now().isoformat()
-        }
-        
-        if expires_at:
-            metadata['expiresAt'] = str(expires_at)
-        
-        blob.metadata = metadata
-        
-        # Upload file
-        blob.upload_from_filename(local_path)
-        
-        # Make publicly accessible (read-only)
-        blob.make_public()
-        
-        print(f"✅ Uploaded {local_path} to {storage_path}")
-        print(f"   Time slot: {time_slot}")
-        print(f"   Public URL: {blob.public_url}")
-        
+        public_url = store_qr_code(backend, local_path, storage_path, time_slot, expires_at)
+        report_upload(local_path, storage_path, time_slot, public_url)
         return True
     except Exception as e:
         print(f"❌ Failed to upload {local_path}: {e}")
         return False
 
-def upload_all_qr_codes(bucket, qr_directory):
+def select_slot_files(qr_dir):
+    """Pick one SVG per time slot (newest match) from a single directory scan
+    
+    Returns:
+        Dict of storage path -> (local path, time slot), including
+        qr_codes/latest.svg for the current slot
+    """
+    with os.scandir(qr_dir) as entries:
+        names = sorted((entry.name for entry in entries
+                        if entry.name.endswith('.svg') and entry.is_file()), reverse=True)
+    
+    current_hour = datetime.now().hour
+    targets = {}
+    for slot_key, slot_value in TIME_SLOTS.items():
+        match = next((name for name in names if slot_key in name), None)
+        if not match:
+            print(f"⚠️  No QR code found for time slot {slot_value}")
+            continue
+        
+        local_file = str(Path(qr_dir) / match)
+        targets[f"{STORAGE_PREFIX}slot_{slot_value.replace(':', '')}.svg"] = (local_file, slot_value)
+        
+        # If this is the current time slot, also upload as latest
+        slot_hour = int(slot_key[:2])
+        if slot_hour <= current_hour < slot_hour + 2:
+            targets[f"{STORAGE_PREFIX}latest.svg"] = (local_file, slot_value)
+    
+    return targets
+
+def upload_all_qr_codes(backend, qr_directory):
     """Upload all QR codes from a directory"""
     qr_dir = Path(qr_directory)
     if not qr_dir.exists():
         print(f"❌ Directory not found: {qr_directory}")
         return
     
-    # Time slot mapping
-    time_slots = {
-        "0000": "00:00-01:59",
-        "0200": "02:00-03:59",
-        "0400": "04:00-05:59",
-        "0600": "06:00-07:59",
-        "0800": "08:00-09:59",
-        "1000": "10:00-11:59",
-        "1200": "12:00-13:59",
-        "1400": "14:00-15:59",
-        "1600": "16:00-17:59",
-        "1800": "18:00-19:59",
-        "2000": "20:00-21:59",
-        "2200": "22:00-23:59"
-    }
-    
     uploaded = 0
     failed = 0
     
     # Upload time-slot specific QR codes
-    for slot_key, slot_value in time_slots.items():
-        # Find matching SVG file
-        matching_files = list(qr_dir.glob(f"*{slot_key}*.svg"))
-        
-        if matching_files:
-            local_file = matching_files[0]
-            storage_path = f"qr_codes/slot_{slot_value.replace(':', '')}.svg"
-            
-            if upload_qr_code(bucket, str(local_file), storage_path, slot_value):
-                uploaded += 1
-                
-                # If this is the current time slot, also upload as latest
-                current_hour = datetime.now().hour
-                slot_hour = int(slot_key[:2])
-                if slot_hour <= current_hour < slot_hour + 2:
-                    upload_qr_code(bucket, str(local_file), "qr_codes/latest.svg", slot_value)
-            else:
-                failed += 1
+    for storage_path, (local_file, slot_value) in select_slot_files(qr_dir).items():
+        if upload_qr_code(backend, local_file, storage_path, slot_value):
+            uploaded += 1
         else:
-            print(f"⚠️  No QR code found for time slot {slot_value}")
+            failed += 1
     
     print(f"\n📊 Upload Summary:")
     print(f"   Uploaded: {uploaded}")
     print(f"   Failed: {failed}")
 
-def upload_single_as_latest(bucket, local_path):
+def sync_qr_codes(backend, qr_directory, workers=SYNC_WORKERS):
+    """Upload only the slot files whose content differs from the bucket
+    
+    The bucket is listed once and compared by MD5, so a sync of unchanged
+    data costs a single list call. Changed files upload in parallel over
+    the client's one authorized session.
+    """
+    qr_dir = Path(qr_directory)
+    if not qr_dir.exists():
+        print(f"❌ Directory not found: {qr_directory}")
+        return
+    
+    targets = select_slot_files(qr_dir)
+    remote = backend.list_md5(STORAGE_PREFIX)
+    
+    changed = {storage_path: target for storage_path, target in targets.items()
+               if remote.get(storage_path) != md5_base64(target[0])}
+    
+    uploaded = 0
+    failed = 0
+    if changed:
+        backend.prepare_workers(workers)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(store_qr_code, backend, local_file, storage_path, slot_value):
+                       (storage_path, local_file, slot_value)
+                       for storage_path, (local_file, slot_value) in changed.items()}
+            # Report from this thread so output from parallel uploads never interleaves
+            for future in as_completed(futures):
+                storage_path, local_file, slot_value = futures[future]
+                try:
+                    report_upload(local_file, storage_path, slot_value, future.result())
+                    uploaded += 1
+                except Exception as e:
+                    print(f"❌ Failed to upload {local_file}: {e}")
+                    failed += 1
+    
+    print(f"\n📊 Sync Summary:")
+    print(f"   Unchanged: {len(targets) - len(changed)}")
+    print(f"   Uploaded: {uploaded}")
+    print(f"   Failed: {failed}")
+
+def upload_single_as_latest(backend, local_path):
     """Upload a single QR code as the latest"""
     # Determine time slot from current time
     current_hour = datetime.now().hour
@@ -125,7 +187,7 @@ def upload_single_as_latest(bucket, local_path):
     ).timestamp() * 1000  # Convert to milliseconds
     
     return upload_qr_code(
-        bucket, 
+        backend, 
         local_path, 
         "qr_codes/latest.svg", 
         time_slot,
@@ -145,13 +207,19 @@ def main():
         print("  python upload_to_firebase.py ./firebase-key.json risegym.appspot.com ./real_qr_codes")
         print("\nFor single file upload:")
         print("  python upload_to_firebase.py ./firebase-key.json risegym.appspot.com --single <file.svg>")
+        print("\nTo upload only changed files:")
+        print("  python upload_to_firebase.py ./firebase-key.json risegym.appspot.com ./real_qr_codes --sync")
+        print("\nTo use a local directory instead of Firebase Storage:")
+        print("  python upload_to_firebase.py --local ./local_bucket ./real_qr_codes --sync")
         sys.exit(1)
     
-    service_account = sys.argv[1]
-    storage_bucket = sys.argv[2]
-    
-    # Initialize Firebase
-    bucket = initialize_firebase(service_account, storage_bucket)
+    if sys.argv[1] == "--local":
+        # Local directory stand-in (no credentials or network)
+        backend = LocalStorageBackend(sys.argv[2])
+        print(f"✅ Using local storage: {backend.root}")
+    else:
+        # Initialize Firebase
+        backend = initialize_firebase(sys.argv[1], sys.argv[2])
     
     # Check for single file mode
     if len(sys.argv) > 3 and sys.argv[3] == "--single":
@@ -160,11 +228,16 @@ def main():
             sys.exit(1)
         
         single_file = sys.argv[4]
-        upload_single_as_latest(bucket, single_file)
+        upload_single_as_latest(backend, single_file)
     else:
-        # Upload all QR codes from directory
-        qr_directory = sys.argv[3] if len(sys.argv) > 3 else "./real_qr_codes"
-        upload_all_qr_codes(bucket, qr_directory)
+        args = [arg for arg in sys.argv[3:] if arg != "--sync"]
+        qr_directory = args[0] if args else "./real_qr_codes"
+        if "--sync" in sys.argv:
+            # Upload only what differs from the bucket
+            sync_qr_codes(backend, qr_directory)
+        else:
+            # Upload all QR codes from directory
+            upload_all_qr_codes(backend, qr_directory)
     
     print("\n✅ Upload complete!")
 